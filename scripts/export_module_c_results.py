@@ -294,7 +294,7 @@ def main():
     bm25 = BM25Retriever(documents)
     tfidf = TFIDFRetriever(documents)
     fuzzy = FuzzyRetriever(documents)
-    semantic = SemanticRetriever(documents, cache_file='data/embeddings_cache.pkl')
+    semantic = SemanticRetriever(documents, cache_file='data/embeddings_cache.npy')
     
     # Test queries
     test_queries = [
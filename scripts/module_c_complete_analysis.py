@@ -197,7 +197,7 @@ def demonstrate_transliteration():
         ("cricket", "ক্রিকেট")
     ]
     
-    from fuzzywuzzy import fuzz
+    from rapidfuzz import fuzz
     
     print("\nFuzzy matching scores for transliteration pairs:")
     print("-" * 70)
@@ -10,7 +10,7 @@ import json
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.retrieval import BM25Retriever, TFIDFRetriever, FuzzyRetriever, SemanticRetriever
+from src.retrieval import BM25Retriever, TFIDFRetriever, FuzzyRetriever, SemanticRetriever, run_all
 
 
 class MultiModelRetrieval:
@@ -40,7 +40,7 @@ class MultiModelRetrieval:
         self.fuzzy = FuzzyRetriever(documents)
         
         print("\n[4/4] Building Semantic Embeddings (this takes 1-5 minutes)...")
-        self.semantic = SemanticRetriever(documents, cache_file='data/embeddings_cache.pkl')
+        self.semantic = SemanticRetriever(documents, cache_file='data/embeddings_cache.npy')
         
         print("\n" + "="*80)
         print("✅ All models ready!")
@@ -57,16 +57,16 @@ class MultiModelRetrieval:
         Returns:
             dict: Results from all models
         """
-        query_tokens = query.lower().split()
-        
-        results = {
-            'query': query,
-            'BM25': self.bm25.search(query_tokens, top_k),
-            'TF-IDF': self.tfidf.search(query_tokens, top_k),
-            'Fuzzy': self.fuzzy.search(query, top_k),
-            'Semantic': self.semantic.search(query, top_k)
+        retrievers = {
+            'BM25': self.bm25,
+            'TF-IDF': self.tfidf,
+            'Fuzzy': self.fuzzy,
+            'Semantic': self.semantic
         }
         
+        results = {'query': query}
+        results.update(run_all(retrievers, query, top_k=top_k))
+        
         return results
     
     def compare(self, query, top_k=5):
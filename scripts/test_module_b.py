@@ -99,8 +99,8 @@ def test_expander():
     # Test expansion
     query = "education"
     result = expander.expand(query, 'english')
-    expansions = result['expansions']
-    methods_used = result['methods']
+    expansions = result.expansions
+    methods_used = result.methods
 
     print(f"  '{query}':")
     for word, terms in expansions.items():
@@ -110,8 +110,8 @@ def test_expander():
     # Test multi-word
     query = "education sports"
     result = expander.expand(query, 'english')
-    for word, terms in result['expansions'].items():
-        method = result['methods'].get(word, 'none')
+    for word, terms in result.expansions.items():
+        method = result.methods.get(word, 'none')
         print(f"  '{word}' -> {len(terms)} terms (method: {method})")
 
     print("  [PASS] Expander working")
@@ -169,15 +169,15 @@ def test_full_pipeline():
 
     result = processor.process(query)
 
-    print(f"  Language: {result['language']}")
-    print(f"  Normalized: {result['normalized']}")
-    print(f"  Translated: [{len(result['translated'])} chars]")
-    print(f"  Entities: {len(result['entities'])}")
-    print(f"  Variants: {len(result['variants'])} queries generated")
+    print(f"  Language: {result.language}")
+    print(f"  Normalized: {result.normalized}")
+    print(f"  Translated: [{len(result.translated)} chars]")
+    print(f"  Entities: {len(result.entities)}")
+    print(f"  Variants: {len(result.variants)} queries generated")
 
     # Show methods used
     print("\n  Methods used:")
-    summary = result['methods_summary']
+    summary = result.methods_summary
     print(f"    Translation: {summary['translation']}")
     print(f"    Entity extraction: {summary['entity_extraction']}")
     if summary['expansion']:
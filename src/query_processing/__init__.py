@@ -6,6 +6,7 @@ from .normalizer import QueryNormalizer
 from .translator import QueryTranslator
 from .expander import QueryExpander
 from .entity_mapper import EntityMapper
+from .results import ExpansionResult, BagExpansionResult, ProcessResult
 
 __all__ = [
     'QueryProcessor',
@@ -14,5 +15,8 @@ __all__ = [
     'QueryNormalizer',
     'QueryTranslator',
     'QueryExpander',
-    'EntityMapper'
+    'EntityMapper',
+    'ExpansionResult',
+    'BagExpansionResult',
+    'ProcessResult'
 ]
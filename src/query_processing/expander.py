@@ -1,9 +1,53 @@
 """Query expansion using WordNet, embeddings, stemming, lemmatization, and Gemini fallback"""
 
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+
+from .results import ExpansionResult, BagExpansionResult
 from ..utils.logger import setup_logger
+from ..utils.helpers import CACHE_DIR
 from ..utils import gemini_api
 
 
+class _LRUCache:
+    """Bounded, thread-safe mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Cache value for key, evicting the oldest entry if full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# WordNet synonyms shared by all QueryExpander instances: {word: tuple(synonyms)}
+_WN_CACHE = _LRUCache(50000)
+
+# Precomputed tables loaded through wordnet_cache; bounded by the file size
+_WN_TABLE = {}
+
+
 class QueryExpander:
     """
     Expand queries with synonyms and related terms
@@ -25,7 +69,17 @@ class QueryExpander:
         'সংবাদ': ['খবর'],
     }
 
-    def __init__(self, max_expansions=5, use_embeddings=True, use_gemini_fallback=True):
+    EMBEDDING_MODEL = 'glove-wiki-gigaword-50'
+
+    # WordNet corpus reader, bound once by _check_wordnet()
+    _wordnet = None
+
+    # Word embeddings shared by instances using the same file, loaded on
+    # first use: {path: KeyedVectors with L2-normalized vectors}
+    _embedding_models = {}
+
+    def __init__(self, max_expansions=5, use_embeddings=True, use_gemini_fallback=True,
+                 wordnet_cache=None, embedding_limit=100000, cache_dir=CACHE_DIR):
         """
         Initialize expander with available backends
 
@@ -33,15 +87,23 @@ class QueryExpander:
             max_expansions: Maximum synonyms per term
             use_embeddings: Whether to use word embeddings for similarity
             use_gemini_fallback: Whether to use Gemini API as fallback for synonyms
+            wordnet_cache: Optional path to a pickled synonym table built with
+                build_wordnet_cache()
+            embedding_limit: Keep only this many most frequent embedding words
+                (None keeps the full vocabulary)
+            cache_dir: Directory for converted, memory-mappable embeddings
         """
         self.logger = setup_logger('QueryExpander')
         self.max_expansions = max_expansions
         self.use_embeddings = use_embeddings
+        self.embedding_limit = embedding_limit
+        self.cache_dir = cache_dir
         self.methods_used = {}
 
         # Check available backends
         self._wordnet_available = self._check_wordnet()
-        self._embeddings_available = self._check_embeddings() if use_embeddings else False
+        self._embedding_backend = self._resolve_embedding_backend() if use_embeddings else None
+        self._embeddings_available = self._embedding_backend is not None
         self._nltk_available = self._check_nltk()
 
         # Check Gemini availability
@@ -51,7 +113,26 @@ class QueryExpander:
         # Lazy loaded resources
         self._lemmatizer = None
         self._stemmer = None
-        self._embedding_model = None
+        self._lemmatize = None
+        self._stem = None
+        self._simsimd = self._load_simsimd() if self._embeddings_available else None
+        # word -> tuple of similar words (empty for words missing from the vocabulary)
+        self._embedding_hits = _LRUCache(50000)
+
+        # Embedding dispatch is resolved once; see _disable_embeddings()
+        if self._embedding_backend == 'gensim':
+            self._embedding_lookup = self._gensim_synonyms_batch
+        else:
+            self._embedding_lookup = self._no_embedding_synonyms
+        self._bangla_automaton = self._build_bangla_automaton()
+        # Multi-word keys, scanned separately when there is no automaton
+        self._bangla_phrases = tuple(key for key in self.BANGLA_FALLBACK if ' ' in key)
+
+        # Stems/lemmas depend only on the word
+        self._get_morphological_variants = lru_cache(maxsize=50000)(self._get_morphological_variants)
+
+        if wordnet_cache:
+            self._load_wordnet_cache(wordnet_cache)
 
         methods = []
         if self._wordnet_available:
@@ -72,6 +153,7 @@ class QueryExpander:
             from nltk.corpus import wordnet
             # Try to access wordnet to ensure data is downloaded
             wordnet.synsets('test')
+            QueryExpander._wordnet = wordnet
             return True
         except Exception:
             try:
@@ -80,21 +162,39 @@ class QueryExpander:
                 nltk.download('omw-1.4', quiet=True)
                 from nltk.corpus import wordnet
                 wordnet.synsets('test')
+                QueryExpander._wordnet = wordnet
                 return True
             except Exception:
                 return False
 
-    def _check_embeddings(self):
-        """Check if word embedding library is available"""
+    def _resolve_embedding_backend(self):
+        """Return the word embedding backend to use ('gensim' or None)"""
         try:
             from gensim.models import KeyedVectors
-            return True
+            return 'gensim'
         except ImportError:
-            try:
-                from sentence_transformers import SentenceTransformer
-                return True
-            except ImportError:
-                return False
+            return None
+
+    def _load_simsimd(self):
+        """Load SimSIMD for batched cosine similarity (optional)"""
+        try:
+            import simsimd
+            return simsimd
+        except ImportError:
+            return None
+
+    def _build_bangla_automaton(self):
+        """Build an Aho-Corasick automaton over BANGLA_FALLBACK keys (optional)"""
+        try:
+            import ahocorasick
+        except ImportError:
+            return None
+
+        automaton = ahocorasick.Automaton()
+        for key in self.BANGLA_FALLBACK:
+            automaton.add_word(key, key)
+        automaton.make_automaton()
+        return automaton
 
     def _check_nltk(self):
         """Check if NLTK stemmer/lemmatizer is available"""
@@ -115,6 +215,7 @@ class QueryExpander:
         if self._lemmatizer is None and self._nltk_available:
             from nltk.stem import WordNetLemmatizer
             self._lemmatizer = WordNetLemmatizer()
+            self._lemmatize = self._lemmatizer.lemmatize
         return self._lemmatizer
 
     def _get_stemmer(self):
@@ -122,6 +223,7 @@ class QueryExpander:
         if self._stemmer is None and self._nltk_available:
             from nltk.stem import PorterStemmer
             self._stemmer = PorterStemmer()
+            self._stem = self._stemmer.stem
         return self._stemmer
 
     def expand(self, query, language=None):
@@ -133,35 +235,149 @@ class QueryExpander:
             language: 'bangla' or 'english' (auto-detect if None)
 
         Returns:
-            Dict with:
+            ExpansionResult with:
                 - expansions: {word: [synonyms]}
                 - methods: {word: method_used}
         """
         if not query:
-            return {'expansions': {}, 'methods': {}}
+            return ExpansionResult({}, {})
 
-        words = query.split()
         expansions = {}
         methods = {}
+        for word, terms, method in self._iter_expansions(query, language):
+            expansions[word] = terms
+            methods[word] = method
 
-        for word in words:
-            word_lower = word.lower()
-            synonyms, method = self._get_synonyms_with_method(word, word_lower, language)
+        self.methods_used = methods
+        return ExpansionResult(expansions, methods)
+
+    def expand_bag(self, query, language=None):
+        """
+        Expand query into a single flat bag of terms
+
+        Unlike expand(), terms are not grouped per word, so downstream
+        retrieval can run one bag-of-words query instead of per-word variants.
 
-            # Include original word + synonyms (limited)
-            all_terms = [word] + synonyms[:self.max_expansions]
-            expansions[word] = list(dict.fromkeys(all_terms))  # Remove duplicates, keep order
+        Args:
+            query: Query string
+            language: 'bangla' or 'english' (auto-detect if None)
+
+        Returns:
+            BagExpansionResult with:
+                - terms: [original words and synonyms], deduplicated
+                - methods: {word: method_used}
+        """
+        if not query:
+            return BagExpansionResult([], {})
+
+        bag = {}
+        methods = {}
+        for word, terms, method in self._iter_expansions(query, language):
+            bag.update(dict.fromkeys(terms))
             methods[word] = method
 
         self.methods_used = methods
-        return {'expansions': expansions, 'methods': methods}
+        return BagExpansionResult(list(bag), methods)
+
+    def _iter_expansions(self, query, language):
+        """
+        Yield (word, [word + synonyms], method) for each distinct query word
+
+        Multi-word fallback entries matched as whole phrases are yielded last.
+        """
+        words = query.split()
+
+        # Resolve each distinct word once; embedding lookups are batched
+        unique_words = list(dict.fromkeys(words))
+        lowered = [word.lower() for word in unique_words]
+        embedding_synonyms = self._prefetch_embedding_synonyms(lowered, language)
+        if language in [None, 'bangla', 'mixed']:
+            bangla_synonyms = self._match_bangla_fallback(query)
+        else:
+            bangla_synonyms = {}
+
+        for word, word_lower in zip(unique_words, lowered):
+            synonyms, method = self._get_synonyms_with_method(
+                word_lower, language, embedding_synonyms, bangla_synonyms
+            )
+
+            # Include original word + synonyms (limited), removing duplicates
+            terms = dict.fromkeys(synonyms)
+            terms.pop(word, None)
+            yield word, [word, *islice(terms, self.max_expansions)], method
+
+        for phrase, synonyms in bangla_synonyms.items():
+            if ' ' in phrase and phrase not in unique_words:
+                yield phrase, [phrase, *synonyms[:self.max_expansions]], 'dictionary_fallback'
+
+    def _prefetch_embedding_synonyms(self, words, language):
+        """
+        Batch embedding lookups for words WordNet does not cover well
+
+        Args:
+            words: Lowercased query words
+            language: Language hint
+
+        Returns:
+            Dict {word_lower: [similar words]}
+        """
+        if not self._embeddings_available or language not in [None, 'english', 'mixed']:
+            return {}
+
+        needed = []
+        for word_lower in dict.fromkeys(words):
+            if self._wordnet_available and len(self._wordnet_synonyms(word_lower)) >= 2:
+                continue
+            needed.append(word_lower)
+
+        return self._embedding_synonyms_batch(needed)
 
-    def _get_synonyms_with_method(self, word, word_lower, language):
+    def _match_bangla_fallback(self, query):
+        """
+        Find BANGLA_FALLBACK entries in a query in one pass
+
+        Args:
+            query: Query string
+
+        Returns:
+            Dict {key: synonyms} for whole-word (or whole-phrase) matches
+        """
+        if self._bangla_automaton is None:
+            matches = {w: self.BANGLA_FALLBACK[w] for w in query.split() if w in self.BANGLA_FALLBACK}
+            for phrase in self._bangla_phrases:
+                start = query.find(phrase)
+                while start != -1:
+                    if self._is_whole_match(query, start, start + len(phrase) - 1):
+                        matches[phrase] = self.BANGLA_FALLBACK[phrase]
+                        break
+                    start = query.find(phrase, start + 1)
+            return matches
+
+        matches = {}
+        for end, key in self._bangla_automaton.iter(query):
+            if self._is_whole_match(query, end - len(key) + 1, end):
+                matches[key] = self.BANGLA_FALLBACK[key]
+        return matches
+
+    @staticmethod
+    def _is_whole_match(query, start, end):
+        """Whether query[start:end + 1] is not part of a longer word (e.g. an inflected form)"""
+        return ((start == 0 or query[start - 1].isspace())
+                and (end == len(query) - 1 or query[end + 1].isspace()))
+
+    def _get_synonyms_with_method(self, word_lower, language, embedding_synonyms=None,
+                                  bangla_synonyms=None):
         """
         Get synonyms for a word, trying multiple methods including Gemini fallback
 
+        Args:
+            word_lower: Lowercased word (lowercasing leaves Bangla unchanged)
+            language: Language hint
+            embedding_synonyms: Optional prefetched {word_lower: [similar words]}
+            bangla_synonyms: Optional prefetched BANGLA_FALLBACK matches
+
         Returns:
-            (list of synonyms, method used)
+            (tuple of synonyms, may contain duplicates; method used)
         """
         synonyms = []
         method = 'none'
@@ -177,7 +393,10 @@ class QueryExpander:
 
             # 2. Try embeddings if WordNet didn't find much
             if len(synonyms) < 2 and self._embeddings_available:
-                emb_synonyms = self._embedding_synonyms(word_lower)
+                if embedding_synonyms is None:
+                    emb_synonyms = self._embedding_synonyms(word_lower)
+                else:
+                    emb_synonyms = embedding_synonyms.get(word_lower)
                 if emb_synonyms:
                     synonyms.extend(emb_synonyms)
                     method = 'embeddings' if not synonyms else f'{method}+embeddings'
@@ -194,106 +413,266 @@ class QueryExpander:
 
         # For Bangla - use fallback dictionary
         if language in [None, 'bangla', 'mixed']:
-            if word in self.BANGLA_FALLBACK:
-                synonyms.extend(self.BANGLA_FALLBACK[word])
+            if bangla_synonyms is None:
+                fallback = self.BANGLA_FALLBACK.get(word_lower)
+            else:
+                fallback = bangla_synonyms.get(word_lower)
+            if fallback:
+                synonyms.extend(fallback)
                 method = 'dictionary_fallback' if method == 'none' else f'{method}+dictionary'
 
         # Fallback to Gemini if no synonyms found and Gemini is available
         if not synonyms and self._gemini_available:
             lang_for_gemini = language if language in ['english', 'bangla'] else 'english'
-            gemini_synonyms = gemini_api.get_synonyms(word, lang_for_gemini, self.max_expansions)
+            gemini_synonyms = gemini_api.get_synonyms(word_lower, lang_for_gemini, self.max_expansions)
             if gemini_synonyms:
                 synonyms.extend(gemini_synonyms)
                 method = 'gemini'
-                self.logger.debug(f"Used Gemini fallback for synonyms of '{word}': {gemini_synonyms}")
+                self.logger.debug(f"Used Gemini fallback for synonyms of '{word_lower}': {gemini_synonyms}")
 
         if not synonyms:
             method = 'none'
 
-        return list(dict.fromkeys(synonyms)), method  # Remove duplicates
+        # Deduplicated once by the caller
+        return tuple(synonyms), method
 
     def _wordnet_synonyms(self, word):
-        """Get synonyms from WordNet"""
-        try:
-            from nltk.corpus import wordnet
+        """Get synonyms from WordNet (cached per word)"""
+        synonyms = self._cached_wordnet(word)
+        if synonyms is None:
+            return []
+
+        return list(synonyms[:self.max_expansions * 2])  # Get more, filter later
+
+    def _cached_wordnet(self, word):
+        """All WordNet synonyms of word from the precomputed table, the LRU or WordNet itself"""
+        synonyms = _WN_TABLE.get(word)
+        if synonyms is None:
+            synonyms = _WN_CACHE.get(word)
+        if synonyms is None:
+            synonyms = self._lookup_wordnet(word)
+            if synonyms is not None:
+                _WN_CACHE.put(word, synonyms)
+        return synonyms
 
-            synonyms = set()
-            for syn in wordnet.synsets(word):
+    def _lookup_wordnet(self, word):
+        """
+        Collect all WordNet synonyms for a word
+
+        Returns:
+            Tuple of synonyms, or None if the lookup failed
+        """
+        try:
+            synonyms = {}
+            for syn in self._wordnet.synsets(word):
                 for lemma in syn.lemmas():
                     name = lemma.name().replace('_', ' ').lower()
                     if name != word and len(name) > 2:
-                        synonyms.add(name)
+                        synonyms[name] = None
 
-            return list(synonyms)[:self.max_expansions * 2]  # Get more, filter later
+            return tuple(synonyms)
 
         except Exception as e:
             self.logger.debug(f"WordNet lookup failed for '{word}': {e}")
-            return []
+            return None
+
+    def _load_wordnet_cache(self, path):
+        """Load a precomputed WordNet synonym table, shared by all instances"""
+        if not os.path.exists(path):
+            self.logger.warning(f"WordNet cache not found: {path}")
+            return
+
+        try:
+            with open(path, 'rb') as f:
+                _WN_TABLE.update(pickle.load(f))
+            self.logger.info(f"Loaded {len(_WN_TABLE)} cached WordNet entries from {path}")
+        except Exception as e:
+            self.logger.warning(f"Failed to load WordNet cache: {e}")
+
+    def build_wordnet_cache(self, vocab_iter, path):
+        """
+        Precompute WordNet synonyms for a vocabulary and save them to disk
+
+        Args:
+            vocab_iter: Iterable of words (e.g. the index vocabulary)
+            path: Output pickle path (pass as wordnet_cache to reuse)
+
+        Returns:
+            Number of words cached
+        """
+        if not self._wordnet_available:
+            self.logger.warning("WordNet not available, cache not built")
+            return 0
+
+        table = {}
+        for word in vocab_iter:
+            word = word.lower()
+            if word in table:
+                continue
+            synonyms = self._cached_wordnet(word)
+            if synonyms is None:
+                continue
+            table[word] = synonyms
+
+        with open(path, 'wb') as f:
+            pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.logger.info(f"Saved {len(table)} WordNet entries to {path}")
+        return len(table)
+
+    def _ensure_embedding_model(self):
+        """
+        Load word embeddings once per process and file, memory-mapped from disk
+
+        The first run downloads GloVe through gensim, keeps the
+        embedding_limit most frequent words, L2-normalizes them and saves
+        them in KeyedVectors format. Later loads map that file read-only,
+        so the matrix sits in the OS page cache and is shared between
+        processes.
+
+        Returns:
+            gensim KeyedVectors
+        """
+        limit = self.embedding_limit
+        # The file name encodes the model and limit, so it keys the shared cache
+        path = os.path.join(self.cache_dir, f"{self.EMBEDDING_MODEL}-{limit or 'full'}.kv")
+        model = QueryExpander._embedding_models.get(path)
+        if model is not None:
+            return model
+
+        from gensim.models import KeyedVectors
+        import numpy as np
+
+        if not os.path.exists(path):
+            import gensim.downloader as api
+
+            self.logger.info(f"Loading word embeddings ({self.EMBEDDING_MODEL})...")
+            full = api.load(self.EMBEDDING_MODEL)
+            keys = full.index_to_key[:limit]
+
+            converted = KeyedVectors(full.vector_size, dtype=np.float32)
+            converted.add_vectors(keys, full.get_normed_vectors()[:len(keys)])
+            os.makedirs(self.cache_dir, exist_ok=True)
+            converted.save(path, separately=['vectors'])
+            self.logger.info(f"Saved {len(keys)} normalized embeddings to {path}")
+
+        model = KeyedVectors.load(path, mmap='r')
+        QueryExpander._embedding_models[path] = model
+        return model
 
     def _embedding_synonyms(self, word):
         """Get similar words using word embeddings"""
-        try:
-            # Try gensim first (lighter weight)
-            try:
-                from gensim.models import KeyedVectors
-                import gensim.downloader as api
+        return self._embedding_lookup([word]).get(word, [])
 
-                if self._embedding_model is None:
-                    self.logger.info("Loading word embeddings (glove-wiki-gigaword-50)...")
-                    self._embedding_model = api.load('glove-wiki-gigaword-50')
+    def _embedding_synonyms_batch(self, words):
+        """Get similar words for several words using the resolved backend"""
+        return self._embedding_lookup(words)
 
-                if word in self._embedding_model:
-                    similar = self._embedding_model.most_similar(word, topn=self.max_expansions)
-                    return [w for w, _ in similar]
-            except Exception:
-                pass
+    @staticmethod
+    def _no_embedding_synonyms(words):
+        """Embedding lookup used when no backend is available"""
+        return {}
 
-            # Fallback to sentence-transformers
-            try:
-                from sentence_transformers import SentenceTransformer, util
-                import torch
+    def _disable_embeddings(self, reason):
+        """Stop using embeddings for this instance (e.g. model failed to load)"""
+        self.logger.warning(f"Word embeddings disabled: {reason}")
+        self._embedding_backend = None
+        self._embeddings_available = False
+        self._embedding_lookup = self._no_embedding_synonyms
 
-                if self._embedding_model is None:
-                    self.logger.info("Loading sentence-transformers model...")
-                    self._embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    def _gensim_synonyms_batch(self, words):
+        """
+        Get similar words for several words with a single matrix product
 
-                # For sentence transformers, we'd need a vocabulary to compare against
-                # This is more complex, so skip for now
-                pass
-            except Exception:
-                pass
+        Args:
+            words: List of lowercased words
 
-            return []
+        Returns:
+            Dict {word: [similar words]} for in-vocabulary words
+        """
+        similar = {}
+        pending = []
+        for word in words:
+            hits = self._embedding_hits.get(word)
+            if hits is None:
+                pending.append(word)
+            elif hits:
+                similar[word] = list(hits)
+
+        if not pending:
+            return similar
 
+        # Only loading can fail (download, disk); don't retry on every query
+        try:
+            model = self._ensure_embedding_model()
         except Exception as e:
-            self.logger.debug(f"Embedding lookup failed for '{word}': {e}")
-            return []
+            self._disable_embeddings(e)
+            return similar
+
+        import numpy as np
+
+        known = []
+        for word in pending:
+            if word in model:
+                known.append(word)
+            else:
+                self._embedding_hits.put(word, ())  # Skip the model next time
+
+        topn = min(self.max_expansions, len(model.index_to_key) - 1)
+        if not known or topn <= 0:
+            return similar
+
+        # Vectors are stored normalized, so cosine reduces to a dot product
+        normed = model.vectors
+
+        # One (len(known) x vocab) product instead of a most_similar() per word
+        rows = [model.key_to_index[w] for w in known]
+        if self._simsimd is not None:
+            sims = 1 - np.asarray(
+                self._simsimd.cdist(normed[rows], normed, metric='cosine'),
+                dtype=np.float32
+            )
+        else:
+            sims = normed[rows] @ normed.T
+        sims[np.arange(len(rows)), rows] = -np.inf  # Exclude the word itself
+        top = np.argpartition(-sims, topn - 1, axis=1)[:, :topn]
+
+        for i, word in enumerate(known):
+            order = top[i][np.argsort(-sims[i, top[i]])]
+            hits = tuple(model.index_to_key[j] for j in order)
+            self._embedding_hits.put(word, hits)
+            similar[word] = list(hits)
+        return similar
 
     def _get_morphological_variants(self, word):
         """Get stem and lemma variants of a word"""
         variants = set()
 
         try:
-            # Lemmatization
-            lemmatizer = self._get_lemmatizer()
-            if lemmatizer:
+            # Lemmatization: call WordNet's morphy directly when bound, which
+            # is what WordNetLemmatizer.lemmatize() wraps (shortest base form)
+            morphy = self._wordnet._morphy if self._wordnet is not None else None
+            if morphy is not None or self._get_lemmatizer():
                 # Try different POS tags
-                for pos in ['n', 'v', 'a', 'r']:  # noun, verb, adj, adverb
-                    lemma = lemmatizer.lemmatize(word, pos=pos)
+                for pos in ('n', 'v', 'a', 'r'):  # noun, verb, adj, adverb
+                    if morphy is not None:
+                        lemmas = morphy(word, pos)
+                        lemma = min(lemmas, key=len) if lemmas else word
+                    else:
+                        lemma = self._lemmatize(word, pos=pos)
                     if lemma != word and len(lemma) > 2:
                         variants.add(lemma)
 
             # Stemming
-            stemmer = self._get_stemmer()
-            if stemmer:
-                stem = stemmer.stem(word)
+            if self._get_stemmer():
+                stem = self._stem(word)
                 if stem != word and len(stem) > 2:
                     variants.add(stem)
 
         except Exception as e:
             self.logger.debug(f"Morphological analysis failed for '{word}': {e}")
 
-        return list(variants)
+        return tuple(variants)
 
     def expand_to_string(self, query, language=None):
         """
@@ -306,14 +685,7 @@ class QueryExpander:
         Returns:
             Expanded query string
         """
-        result = self.expand(query, language)
-        expansions = result['expansions']
-
-        all_terms = set()
-        for terms in expansions.values():
-            all_terms.update(terms)
-
-        return ' '.join(all_terms)
+        return ' '.join(self.expand_bag(query, language).terms)
 
     def get_methods_used(self):
         """Return methods used for each word in last expansion"""
@@ -1,6 +1,55 @@
 """Language detection for queries"""
 
 import re
+from functools import lru_cache
+
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Inputs longer than this are counted with NumPy instead of a Python loop
+VECTORIZE_MIN_LENGTH = 256
+
+
+def _script_counts(query):
+    """
+    Count Bangla and English letters in a single pass
+
+    Args:
+        query: Query string
+
+    Returns:
+        (bangla_count, english_count) tuple
+    """
+    if np is not None and len(query) > VECTORIZE_MIN_LENGTH:
+        return _script_counts_vectorized(query)
+    return _script_counts_short(query)
+
+
+@lru_cache(maxsize=4096)
+def _script_counts_short(query):
+    """Count letters with a codepoint loop (cached; used for short queries)"""
+    bangla_count = 0
+    english_count = 0
+    for ch in query:
+        cp = ord(ch)
+        if 0x0980 <= cp <= 0x09FF:
+            bangla_count += 1
+        elif 97 <= cp <= 122 or 65 <= cp <= 90:
+            english_count += 1
+    return bangla_count, english_count
+
+
+def _script_counts_vectorized(query):
+    """Count letters over a uint32 codepoint array (long inputs, not cached)"""
+    codepoints = np.frombuffer(query.encode('utf-32-le'), dtype=np.uint32)
+    # Unsigned wraparound turns each range check into one comparison;
+    # OR-ing 0x20 folds A-Z onto a-z
+    bangla_count = np.count_nonzero((codepoints - np.uint32(0x0980)) < 0x80)
+    english_count = np.count_nonzero(((codepoints | np.uint32(0x20)) - np.uint32(0x61)) < 26)
+    return int(bangla_count), int(english_count)
 
 
 class QueryLanguageDetector:
@@ -23,8 +72,7 @@ class QueryLanguageDetector:
         if not query or not query.strip():
             return 'unknown'
 
-        bangla_count = len(self.BANGLA_PATTERN.findall(query))
-        english_count = len(self.ENGLISH_PATTERN.findall(query))
+        bangla_count, english_count = _script_counts(query)
         total = bangla_count + english_count
 
         if total == 0:
@@ -52,8 +100,7 @@ class QueryLanguageDetector:
         if not query:
             return 0.0
 
-        bangla_count = len(self.BANGLA_PATTERN.findall(query))
-        english_count = len(self.ENGLISH_PATTERN.findall(query))
+        bangla_count, english_count = _script_counts(query)
         total = bangla_count + english_count
 
         if total == 0:
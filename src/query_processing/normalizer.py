@@ -30,6 +30,18 @@ class QueryNormalizer:
         'নিয়ে', 'সাথে', 'মধ্যে', 'উপর', 'নিচে', 'পরে', 'আগে'
     }
 
+    # Stopword set checked per language (both when language is unknown)
+    _ALL_STOPWORDS = frozenset(ENGLISH_STOPWORDS | BANGLA_STOPWORDS)
+    _STOPWORDS_BY_LANGUAGE = {
+        'english': frozenset(ENGLISH_STOPWORDS),
+        'bangla': frozenset(BANGLA_STOPWORDS),
+    }
+
+    # Runs of whitespace and/or zero-width characters, cleaned in one pass
+    _CLEAN_RE = re.compile(r'[\s\u200b-\u200d\ufeff]+')
+    _ZERO_WIDTH = '\u200b\u200c\u200d\ufeff'
+    _TOKEN_RE = re.compile(r'[\w\u0980-\u09FF]+')
+
     def __init__(self, remove_stopwords=False):
         """
         Initialize normalizer
@@ -73,20 +85,21 @@ class QueryNormalizer:
         return query.strip()
 
     def _clean_whitespace(self, text):
-        """Remove extra whitespace"""
-        # Replace multiple spaces with single space
-        text = re.sub(r'\s+', ' ', text)
+        """Remove extra whitespace and zero-width characters"""
+        # Whitespace runs become a single space; pure zero-width runs are dropped
+        text = self._CLEAN_RE.sub(self._clean_match, text)
         return text.strip()
 
+    @classmethod
+    def _clean_match(cls, match):
+        """Replacement for a _CLEAN_RE match"""
+        return ' ' if match.group().strip(cls._ZERO_WIDTH) else ''
+
     def _normalize_bangla(self, text):
         """Normalize Bangla text"""
-        # Unicode normalization (NFC)
-        text = unicodedata.normalize('NFC', text)
-
-        # Remove zero-width characters
-        text = re.sub(r'[\u200b-\u200d\ufeff]', '', text)
-
-        return text
+        # Unicode normalization (NFC); zero-width characters are already
+        # stripped by _clean_whitespace
+        return unicodedata.normalize('NFC', text)
 
     def _normalize_english(self, text):
         """Normalize English text"""
@@ -96,26 +109,10 @@ class QueryNormalizer:
 
     def _remove_stopwords(self, text, language=None):
         """Remove stopwords from text"""
-        words = text.split()
-        filtered = []
-
-        for word in words:
-            word_lower = word.lower()
-
-            # Check against both stopword sets if language not specified
-            if language == 'english':
-                if word_lower not in self.ENGLISH_STOPWORDS:
-                    filtered.append(word)
-            elif language == 'bangla':
-                if word not in self.BANGLA_STOPWORDS:
-                    filtered.append(word)
-            else:
-                # Check both
-                if (word_lower not in self.ENGLISH_STOPWORDS and
-                    word not in self.BANGLA_STOPWORDS):
-                    filtered.append(word)
-
-        return ' '.join(filtered)
+        # Check against both stopword sets if language not specified.
+        # lower() leaves Bangla unchanged, so one lookup covers both sets.
+        stopwords = self._STOPWORDS_BY_LANGUAGE.get(language, self._ALL_STOPWORDS)
+        return ' '.join([word for word in text.split() if word.lower() not in stopwords])
 
     def tokenize(self, query):
         """
@@ -128,5 +125,4 @@ class QueryNormalizer:
             List of tokens
         """
         # Split on whitespace and punctuation
-        tokens = re.findall(r'[\w\u0980-\u09FF]+', query)
-        return tokens
+        return self._TOKEN_RE.findall(query)
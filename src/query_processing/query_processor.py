@@ -1,10 +1,17 @@
 """Main query processing pipeline with proper NLP methods"""
 
+import copy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+
 from .language_detector import QueryLanguageDetector
 from .normalizer import QueryNormalizer
 from .translator import QueryTranslator
 from .expander import QueryExpander
 from .entity_mapper import EntityMapper
+from .results import ProcessResult
 from ..utils.logger import setup_logger
 
 
@@ -20,7 +27,10 @@ class QueryProcessor:
     5. Named Entity Mapping (spaCy NER / Dictionary)
     """
 
-    def __init__(self, expand_queries=True, remove_stopwords=False, use_gpu=False):
+    EXPAND_MODES = ('per_word', 'bag')
+
+    def __init__(self, expand_queries=True, remove_stopwords=False, use_gpu=False, cache_size=1024,
+                 expand_mode='per_word'):
         """
         Initialize query processor
 
@@ -28,7 +38,14 @@ class QueryProcessor:
             expand_queries: Whether to expand with synonyms
             remove_stopwords: Whether to remove stopwords
             use_gpu: Whether to use GPU for neural models
+            cache_size: Number of processed queries to keep (0 disables caching)
+            expand_mode: 'per_word' ({word: [synonyms]}) or 'bag' (one flat
+                term list under result['expanded']['_bag'], searched as a
+                single query variant)
         """
+        if expand_mode not in self.EXPAND_MODES:
+            raise ValueError(f"expand_mode must be one of {self.EXPAND_MODES}, got {expand_mode!r}")
+
         self.logger = setup_logger('QueryProcessor')
 
         # Initialize components
@@ -39,6 +56,17 @@ class QueryProcessor:
         self.entity_mapper = EntityMapper()
 
         self.expand_queries = expand_queries
+        self.expand_mode = expand_mode
+
+        # Caches for repeated queries (evaluation loops, user retries)
+        expand = self.expander.expand_bag if expand_mode == 'bag' else self.expander.expand
+        self._expand_cached = lru_cache(maxsize=4096)(expand)
+        self._process_cache = OrderedDict()
+        self._cache_size = cache_size
+
+        # Workers for the independent pipeline stages in process(), started
+        # on first use and stopped by close()
+        self._executor = None
 
         # Log available methods
         self.logger.info("QueryProcessor initialized")
@@ -51,83 +79,111 @@ class QueryProcessor:
             query: Raw query string
 
         Returns:
-            Dict with processed query information including methods used
+            ProcessResult with processed query information including methods used
+            (fields are also readable as result['field'])
         """
         if not query or not query.strip():
             return self._empty_result()
 
-        result = {
-            'original': query,
-            'language': None,
-            'normalized': None,
-            'translated': None,
-            'translation_method': None,
-            'expanded': {},
-            'expansion_methods': {},
-            'entities': [],
-            'entity_method': None,
-            'variants': [],
-            'methods_summary': {}
-        }
+        if query in self._process_cache:
+            self._process_cache.move_to_end(query)
+            return copy.deepcopy(self._process_cache[query])
+
+        result = ProcessResult(original=query)
 
         # Step 1: Language Detection
         language = self.language_detector.detect(query)
-        result['language'] = language
+        result.language = language
         self.logger.info(f"Detected language: {language}")
 
         # Step 2: Normalization
         normalized = self.normalizer.normalize(query, language)
-        result['normalized'] = normalized
+        result.normalized = normalized
         self.logger.info(f"Normalized: {normalized}")
 
-        # Step 3: Translation
+        # Steps 3-5 only depend on the normalized query, so translation,
+        # entity extraction and expansion of the original run concurrently
         target_lang = 'english' if language == 'bangla' else 'bangla'
+        executor = self._get_executor()
+        translate_future = None
         if language in ['bangla', 'english']:
-            translated = self.translator.translate(normalized, language, target_lang)
-            result['translated'] = translated
-            result['translation_method'] = self.translator.get_method_used()
-            self.logger.info(f"Translated [{result['translation_method']}]: {len(translated)} chars")
+            translate_future = executor.submit(
+                self.translator.translate, normalized, language, target_lang
+            )
+        entity_future = executor.submit(
+            self.entity_mapper.extract_and_map, normalized, language, target_lang
+        )
+        expand_future = None
+        if self.expand_queries:
+            expand_future = executor.submit(self._expand_cached, normalized, language)
+
+        # Step 3: Translation
+        if translate_future is not None:
+            translated = translate_future.result()
+            result.translated = translated
+            result.translation_method = self.translator.get_method_used()
+            self.logger.info(f"Translated [{result.translation_method}]: {len(translated)} chars")
         else:
-            result['translated'] = normalized
-            result['translation_method'] = 'none'
+            result.translated = normalized
+            result.translation_method = 'none'
 
         # Step 4: Entity Extraction and Mapping
-        entities = self.entity_mapper.extract_and_map(normalized, language, target_lang)
-        result['entities'] = entities
-        result['entity_method'] = self.entity_mapper.get_method_used()
+        entities = entity_future.result()
+        result.entities = entities
+        result.entity_method = self.entity_mapper.get_method_used()
         if entities:
-            self.logger.info(f"Found {len(entities)} entities [{result['entity_method']}]")
+            self.logger.info(f"Found {len(entities)} entities [{result.entity_method}]")
 
         # Step 5: Query Expansion
         if self.expand_queries:
-            expansion_result = self.expander.expand(normalized, language)
-            result['expanded'] = expansion_result['expansions']
-            result['expansion_methods'] = expansion_result['methods']
+            expansion_result = expand_future.result()
+            # Copy: cached methods are shared and merged into below
+            result.expansion_methods = dict(expansion_result.methods)
 
             # Also expand translated query
-            if result['translated'] and result['translated'] != normalized:
-                translated_expansion = self.expander.expand(result['translated'], target_lang)
-                # Merge expansions
-                for word, synonyms in translated_expansion['expansions'].items():
-                    if word not in result['expanded']:
-                        result['expanded'][word] = synonyms
-                        result['expansion_methods'][word] = translated_expansion['methods'].get(word, 'none')
+            translated_expansion = None
+            if result.translated and result.translated != normalized:
+                translated_expansion = self._expand_cached(result.translated, target_lang)
+
+            if self.expand_mode == 'bag':
+                bag = dict.fromkeys(expansion_result.terms)
+                if translated_expansion:
+                    bag.update(dict.fromkeys(translated_expansion.terms))
+                    for word, method in translated_expansion.methods.items():
+                        result.expansion_methods.setdefault(word, method)
+                result.expanded = {'_bag': list(bag)}
+            else:
+                # Copy the term lists too: cached expansions are shared by
+                # later queries, and callers may modify what is returned
+                result.expanded = {word: list(terms) for word, terms in expansion_result.expansions.items()}
+                if translated_expansion:
+                    # Merge expansions
+                    for word, synonyms in translated_expansion.expansions.items():
+                        if word not in result.expanded:
+                            result.expanded[word] = list(synonyms)
+                            result.expansion_methods[word] = translated_expansion.methods.get(word, 'none')
 
             # Log expansion methods
-            unique_methods = set(result['expansion_methods'].values())
+            unique_methods = set(result.expansion_methods.values())
             if unique_methods:
                 self.logger.info(f"Expanded using: {', '.join(unique_methods)}")
 
         # Generate query variants for retrieval
-        result['variants'] = self._generate_variants(result)
+        result.variants = self._generate_variants(result)
 
         # Summary of methods used
-        result['methods_summary'] = {
-            'translation': result['translation_method'],
-            'entity_extraction': result['entity_method'],
-            'expansion': list(set(result['expansion_methods'].values())) if result['expansion_methods'] else []
+        result.methods_summary = {
+            'translation': result.translation_method,
+            'entity_extraction': result.entity_method,
+            'expansion': list(set(result.expansion_methods.values())) if result.expansion_methods else []
         }
 
+        if self._cache_size > 0:
+            self._process_cache[query] = result
+            if len(self._process_cache) > self._cache_size:
+                self._process_cache.popitem(last=False)
+            return copy.deepcopy(result)
+
         return result
 
     def _generate_variants(self, result):
@@ -140,44 +196,30 @@ class QueryProcessor:
         Returns:
             List of query variants
         """
-        variants = set()
-
-        # Add original normalized query
-        if result['normalized']:
-            variants.add(result['normalized'])
-
-        # Add translated query
-        if result['translated']:
-            variants.add(result['translated'])
-
-        # Add entity variants (mapped versions)
-        for entity in result['entities']:
-            if entity.get('mapped'):
-                variants.add(entity['mapped'])
-
-        # Add expanded terms
-        for terms in result['expanded'].values():
-            for term in terms:
-                if isinstance(term, str):
-                    variants.add(term)
-
-        return list(variants)
+        variants = chain(
+            # Original normalized query and translated query
+            (result.normalized,) if result.normalized else (),
+            (result.translated,) if result.translated else (),
+            # Entity variants (mapped versions)
+            (entity['mapped'] for entity in result.entities if entity.get('mapped')),
+            # Expanded terms (a bag is searched as one query, not term by term)
+            (' '.join(result.expanded['_bag']),) if result.expanded.get('_bag') else
+            (term for terms in result.expanded.values() for term in terms if isinstance(term, str)),
+        )
+
+        # Deduplicate, keeping first-seen order
+        return list(dict.fromkeys(variants))
 
     def _empty_result(self):
         """Return empty result for invalid queries"""
-        return {
-            'original': '',
-            'language': 'unknown',
-            'normalized': '',
-            'translated': '',
-            'translation_method': 'none',
-            'expanded': {},
-            'expansion_methods': {},
-            'entities': [],
-            'entity_method': 'none',
-            'variants': [],
-            'methods_summary': {}
-        }
+        return ProcessResult(
+            original='',
+            language='unknown',
+            normalized='',
+            translated='',
+            translation_method='none',
+            entity_method='none'
+        )
 
     def get_search_queries(self, query):
         """
@@ -189,8 +231,7 @@ class QueryProcessor:
         Returns:
             List of queries to search for
         """
-        result = self.process(query)
-        return result['variants']
+        return self.process(query).variants
 
     def get_available_methods(self):
         """Return all available methods across components"""
@@ -200,6 +241,29 @@ class QueryProcessor:
             'entity_extraction': self.entity_mapper.get_available_methods()
         }
 
+    def clear_cache(self):
+        """Clear processed-query and expansion caches"""
+        self._process_cache.clear()
+        self._expand_cached.cache_clear()
+
+    def _get_executor(self):
+        """Return the worker pool, starting it if needed"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='QueryProcessor')
+        return self._executor
+
+    def close(self):
+        """Stop the worker threads (a later process() call starts new ones)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 # Convenience function
 def process_query(query):
@@ -210,7 +274,7 @@ def process_query(query):
         query: Raw query string
 
     Returns:
-        Processed query result dict
+        ProcessResult
     """
-    processor = QueryProcessor()
-    return processor.process(query)
+    with QueryProcessor() as processor:
+        return processor.process(query)
@@ -0,0 +1,123 @@
+"""Result types returned by the query processing pipeline"""
+
+from typing import NamedTuple
+
+
+# Read-only mapping access shared by the result types, so code written
+# against the earlier dict return values keeps using result['field'],
+# result.get('field'), 'field' in result, result.items() and dict(result)
+
+def _getitem(self, key):
+    if isinstance(key, str):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+    return tuple.__getitem__(self, key)
+
+
+def _contains(self, key):
+    return key in self._fields
+
+
+def _get(self, key, default=None):
+    """Return a field value, or default if there is no such field"""
+    return getattr(self, key) if key in self._fields else default
+
+
+def _keys(self):
+    """Return field names"""
+    return list(self._fields)
+
+
+def _items(self):
+    """Return (field name, value) pairs"""
+    return [(name, getattr(self, name)) for name in self._fields]
+
+
+def _to_dict(self):
+    """Return the fields as a plain (shallow) dict, e.g. for json.dumps()"""
+    return {name: getattr(self, name) for name in self._fields}
+
+
+class ExpansionResult(NamedTuple):
+    """Output of QueryExpander.expand()"""
+
+    expansions: dict  # {word: [word + synonyms]}
+    methods: dict  # {word: method_used}
+
+    __getitem__ = _getitem
+    __contains__ = _contains
+    get = _get
+    keys = _keys
+    items = _items
+    to_dict = _to_dict
+
+
+class BagExpansionResult(NamedTuple):
+    """Output of QueryExpander.expand_bag()"""
+
+    terms: list  # Original words and synonyms, deduplicated
+    methods: dict  # {word: method_used}
+
+    __getitem__ = _getitem
+    __contains__ = _contains
+    get = _get
+    keys = _keys
+    items = _items
+    to_dict = _to_dict
+
+
+class ProcessResult:
+    """Output of QueryProcessor.process()"""
+
+    __slots__ = (
+        'original',
+        'language',
+        'normalized',
+        'translated',
+        'translation_method',
+        'expanded',
+        'expansion_methods',
+        'entities',
+        'entity_method',
+        'variants',
+        'methods_summary',
+    )
+    _fields = __slots__
+
+    def __init__(self, original='', language=None, normalized=None, translated=None,
+                 translation_method=None, expanded=None, expansion_methods=None, entities=None,
+                 entity_method=None, variants=None, methods_summary=None):
+        self.original = original
+        self.language = language
+        self.normalized = normalized
+        self.translated = translated
+        self.translation_method = translation_method
+        self.expanded = {} if expanded is None else expanded
+        self.expansion_methods = {} if expansion_methods is None else expansion_methods
+        self.entities = [] if entities is None else entities
+        self.entity_method = entity_method
+        self.variants = [] if variants is None else variants
+        self.methods_summary = {} if methods_summary is None else methods_summary
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    __contains__ = _contains
+    get = _get
+    keys = _keys
+    items = _items
+    to_dict = _to_dict
+
+    def __eq__(self, other):
+        if not isinstance(other, ProcessResult):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.items())
+        return f'ProcessResult({fields})'
@@ -1,6 +1,15 @@
 """Query translation between Bangla and English using proper NLP models"""
 
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
 from ..utils.logger import setup_logger
+from ..utils.helpers import CACHE_DIR
 
 
 class QueryTranslator:
@@ -13,6 +22,19 @@ class QueryTranslator:
     3. Dictionary fallback (last resort)
     """
 
+    MARIAN_MODELS = {
+        'bn_en': "Helsinki-NLP/opus-mt-bn-en",
+        'en_bn': "Helsinki-NLP/opus-mt-en-mul",  # English to multilingual
+    }
+
+    # Queries are short; cap encoder input and decoder output, greedy decoding
+    MAX_INPUT_TOKENS = 128
+    MAX_OUTPUT_TOKENS = 64
+
+    # Only model translations are persisted; a dictionary fallback result
+    # reflects a temporary backend failure and should be retried next run
+    PERSISTED_METHODS = frozenset({'google_translate', 'marian_mt'})
+
     # Minimal dictionary fallback (last resort only)
     FALLBACK_DICT = {
         'en_to_bn': {
@@ -27,31 +49,59 @@ class QueryTranslator:
         }
     }
 
-    def __init__(self, use_gpu=False):
+    def __init__(self, use_gpu=False, batch_size=32, cache_size=10000,
+                 cache_db=os.path.join(CACHE_DIR, 'translations.sqlite'), max_resident=None):
         """
         Initialize translator with available backends
 
         Args:
             use_gpu: Whether to use GPU for MarianMT (if available)
+            batch_size: Maximum texts per MarianMT generate call in translate_batch()
+            cache_size: Maximum number of cached translations (least recently
+                used entries are evicted first)
+            cache_db: Path of the SQLite database persisting translations
+                across runs, or None to cache in memory only
+            max_resident: Maximum MarianMT models kept loaded at once, least
+                recently used unloaded first (default: no limit, so both
+                directions stay loaded; on a CUDA out-of-memory error while
+                loading, the other models are unloaded and loading retried)
         """
         self.logger = setup_logger('Translator')
         self.use_gpu = use_gpu
+        self.batch_size = batch_size
         self.method_used = None
-        self._cache = {}
+        self._cache = OrderedDict()  # (source_lang, target_lang, text) -> (result, method)
+        self._cache_max = cache_size
+        self._db_lock = threading.Lock()
+        self._db = self._open_cache_db(cache_db) if cache_db else None
+
+        # Fallback dictionaries keyed on casefolded words; Bangla has no case
+        # so its lookups skip casefolding. direction -> (dictionary, needs_case)
+        self._fallback_norm = {
+            'en_to_bn': ({k.casefold(): v for k, v in self.FALLBACK_DICT['en_to_bn'].items()}, True),
+            'bn_to_en': (dict(self.FALLBACK_DICT['bn_to_en']), False),
+        }
+
+        # torch / transformers handles, bound by _check_marian()
+        self._torch = None
+        self._MarianMTModel = None
+        self._MarianTokenizer = None
+        self._device = None
 
         # Check available backends
         self._google_available = self._check_google_translate()
         self._marian_available = self._check_marian()
+        self._ct2_available = self._check_ct2() if self._marian_available else False
 
-        # MarianMT models (lazy loaded)
-        self._marian_bn_en = None
-        self._marian_en_bn = None
+        # MarianMT models (lazy loaded), direction -> (tokenizer, model)
+        self._marian_models = OrderedDict()
+        self._max_resident = max_resident
 
         methods = []
         if self._google_available:
             methods.append('GoogleTranslate')
         if self._marian_available:
-            methods.append('MarianMT')
+            methods.append('MarianMT (CTranslate2 int8)' if self._ct2_available else 'MarianMT')
         methods.append('Dictionary')
 
         self.logger.info(f"Translator initialized. Available: {', '.join(methods)}")
@@ -65,9 +115,28 @@ class QueryTranslator:
             return False
 
     def _check_marian(self):
-        """Check if transformers/MarianMT is available"""
+        """Check if transformers/MarianMT is available and bind its classes"""
+        if self.use_gpu:
+            # Must be set before CUDA initialises; reduces fragmentation when
+            # MarianMT shares the GPU with the embedding models
+            os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True')
+
         try:
+            import torch
             from transformers import MarianMTModel, MarianTokenizer
+        except ImportError:
+            return False
+
+        self._torch = torch
+        self._MarianMTModel = MarianMTModel
+        self._MarianTokenizer = MarianTokenizer
+        self._device = torch.device('cuda' if self.use_gpu and torch.cuda.is_available() else 'cpu')
+        return True
+
+    def _check_ct2(self):
+        """Check if CTranslate2 is available for faster MarianMT inference"""
+        try:
+            import ctranslate2
             return True
         except ImportError:
             return False
@@ -82,43 +151,109 @@ class QueryTranslator:
         Returns:
             (tokenizer, model) tuple or (None, None)
         """
-        if not self._marian_available:
+        if not self._marian_available or direction not in self.MARIAN_MODELS:
             return None, None
 
-        from transformers import MarianMTModel, MarianTokenizer
+        if direction in self._marian_models:
+            self._marian_models.move_to_end(direction)
+            return self._marian_models[direction]
 
         try:
-            if direction == 'bn_en':
-                if self._marian_bn_en is None:
-                    model_name = "Helsinki-NLP/opus-mt-bn-en"
-                    self.logger.info(f"Loading MarianMT: {model_name}")
-                    tokenizer = MarianTokenizer.from_pretrained(model_name)
-                    model = MarianMTModel.from_pretrained(model_name)
-                    if self.use_gpu:
-                        import torch
-                        if torch.cuda.is_available():
-                            model = model.cuda()
-                    self._marian_bn_en = (tokenizer, model)
-                return self._marian_bn_en
-
-            elif direction == 'en_bn':
-                if self._marian_en_bn is None:
-                    model_name = "Helsinki-NLP/opus-mt-en-mul"  # English to multilingual
-                    self.logger.info(f"Loading MarianMT: {model_name}")
-                    tokenizer = MarianTokenizer.from_pretrained(model_name)
-                    model = MarianMTModel.from_pretrained(model_name)
-                    if self.use_gpu:
-                        import torch
-                        if torch.cuda.is_available():
-                            model = model.cuda()
-                    self._marian_en_bn = (tokenizer, model)
-                return self._marian_en_bn
-
+            loaded = self._build_marian(self.MARIAN_MODELS[direction])
         except Exception as e:
-            self.logger.warning(f"Failed to load MarianMT model: {e}")
-            return None, None
+            if not (self._is_cuda_oom(e) and self.unload()):
+                self.logger.warning(f"Failed to load MarianMT model: {e}")
+                return None, None
+            # Out of GPU memory: retry with the other models unloaded
+            try:
+                loaded = self._build_marian(self.MARIAN_MODELS[direction])
+            except Exception as e:
+                self.logger.warning(f"Failed to load MarianMT model: {e}")
+                return None, None
+
+        self._marian_models[direction] = loaded
+        if self._max_resident is not None:
+            while len(self._marian_models) > self._max_resident:
+                self.unload(next(iter(self._marian_models)))
+        return loaded
+
+    def _is_cuda_oom(self, error):
+        """Whether error is a CUDA out-of-memory error"""
+        if self._device is None or self._device.type != 'cuda':
+            return False
+        oom = getattr(self._torch.cuda, 'OutOfMemoryError', None)
+        if oom is not None and isinstance(error, oom):
+            return True
+        return isinstance(error, RuntimeError) and 'out of memory' in str(error)
+
+    def unload(self, direction=None):
+        """
+        Unload MarianMT models and release their GPU memory
+
+        Args:
+            direction: 'bn_en' or 'en_bn', or None to unload both
+
+        Returns:
+            Number of models unloaded
+        """
+        directions = list(self._marian_models) if direction is None else [direction]
+        unloaded = 0
+        for d in directions:
+            if self._marian_models.pop(d, None) is not None:
+                self.logger.info(f"Unloaded MarianMT: {self.MARIAN_MODELS[d]}")
+                unloaded += 1
+
+        if unloaded and self._device is not None and self._device.type == 'cuda':
+            self._torch.cuda.empty_cache()
+        return unloaded
+
+    def _build_marian(self, model_name):
+        """
+        Load tokenizer and model for a MarianMT checkpoint
 
-        return None, None
+        Uses a CTranslate2 int8 translator when available, falling back to
+        the HuggingFace model.
+
+        Returns:
+            (tokenizer, model) tuple
+        """
+        self.logger.info(f"Loading MarianMT: {model_name}")
+        tokenizer = self._MarianTokenizer.from_pretrained(model_name)
+
+        if self._ct2_available:
+            try:
+                return tokenizer, self._load_ct2_translator(model_name)
+            except Exception as e:
+                self.logger.warning(f"CTranslate2 unavailable for {model_name}, using transformers: {e}")
+
+        model = self._MarianMTModel.from_pretrained(model_name)
+        if self._device.type == 'cuda':
+            # Half precision on GPU only; FP16 on CPU is slower than FP32
+            model = model.to(self._device).half()
+        return tokenizer, model
+
+    def _load_ct2_translator(self, model_name):
+        """
+        Load a CTranslate2 int8 translator, converting the checkpoint on first use
+
+        Converted models are kept under CACHE_DIR/ct2.
+        """
+        import ctranslate2
+
+        model_dir = os.path.join(CACHE_DIR, 'ct2', model_name.replace('/', '--'))
+        if not os.path.exists(os.path.join(model_dir, 'model.bin')):
+            self.logger.info(f"Converting {model_name} to CTranslate2 (int8)...")
+            converter = ctranslate2.converters.TransformersConverter(model_name)
+            converter.convert(model_dir, quantization='int8', force=True)
+
+        use_cuda = self.use_gpu and ctranslate2.get_cuda_device_count() > 0
+        return ctranslate2.Translator(
+            model_dir,
+            device='cuda' if use_cuda else 'cpu',
+            compute_type='int8_float16' if use_cuda else 'int8',
+            intra_threads=max(1, (os.cpu_count() or 2) // 2),
+            inter_threads=2,
+        )
 
     def translate(self, text, source_lang, target_lang):
         """
@@ -141,10 +276,11 @@ class QueryTranslator:
             return text
 
         # Check cache
-        cache_key = f"{source_lang}:{target_lang}:{text}"
-        if cache_key in self._cache:
-            self.method_used = self._cache[cache_key][1]
-            return self._cache[cache_key][0]
+        cache_key = (source_lang, target_lang, text)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            result, self.method_used = cached
+            return result
 
         result = None
 
@@ -152,24 +288,160 @@ class QueryTranslator:
         if self._google_available:
             result = self._translate_google(text, source_lang, target_lang)
             if result:
-                self.method_used = 'google_translate'
-                self._cache[cache_key] = (result, self.method_used)
+                self._store(cache_key, result, 'google_translate')
                 return result
 
         # 2. Try MarianMT
         if self._marian_available:
             result = self._translate_marian(text, source_lang, target_lang)
             if result:
-                self.method_used = 'marian_mt'
-                self._cache[cache_key] = (result, self.method_used)
+                self._store(cache_key, result, 'marian_mt')
                 return result
 
         # 3. Dictionary fallback (last resort)
         result = self._translate_dictionary(text, source_lang, target_lang)
-        self.method_used = 'dictionary_fallback'
-        self._cache[cache_key] = (result, self.method_used)
+        self._store(cache_key, result, 'dictionary_fallback')
         return result
 
+    def translate_batch(self, texts, source_lang, target_lang):
+        """
+        Translate several texts, batching MarianMT inference
+
+        Cached texts are served from cache, and every new translation is
+        cached so later translate() calls for the same text hit it.
+
+        Args:
+            texts: List of texts to translate
+            source_lang: 'bangla' or 'english'
+            target_lang: 'bangla' or 'english'
+
+        Returns:
+            List of translated texts in input order (self.method_used holds
+            the method used for the last translated text)
+        """
+        results = list(texts)
+        pending = {}  # text -> indices in texts
+        translations = {}  # text -> translation
+
+        for i, text in enumerate(texts):
+            if not text or not text.strip() or source_lang == target_lang:
+                continue
+            cached = self._cache_get((source_lang, target_lang, text))
+            if cached is not None:
+                results[i], self.method_used = cached
+            else:
+                pending.setdefault(text, []).append(i)
+
+        remaining = list(pending)
+
+        # 1. Try Google Translate, requests in parallel
+        if remaining and self._google_available:
+            untranslated = []
+            google_results = self.translate_batch_google(remaining, source_lang, target_lang)
+            for text, result in zip(remaining, google_results):
+                if result:
+                    translations[text] = result
+                    self._store((source_lang, target_lang, text), result, 'google_translate')
+                else:
+                    untranslated.append(text)
+            remaining = untranslated
+
+        # 2. Try MarianMT, all remaining texts together
+        if remaining and self._marian_available:
+            translated = self._translate_marian_batch(remaining, source_lang, target_lang)
+            if translated:
+                untranslated = []
+                for text, result in zip(remaining, translated):
+                    if result:
+                        translations[text] = result
+                        self._store((source_lang, target_lang, text), result, 'marian_mt')
+                    else:
+                        untranslated.append(text)
+                remaining = untranslated
+
+        # 3. Dictionary fallback (last resort)
+        for text in remaining:
+            result = self._translate_dictionary(text, source_lang, target_lang)
+            translations[text] = result
+            self._store((source_lang, target_lang, text), result, 'dictionary_fallback')
+
+        for text, indices in pending.items():
+            for i in indices:
+                results[i] = translations[text]
+
+        return results
+
+    def _open_cache_db(self, path):
+        """
+        Open (creating if needed) the persistent translation cache
+
+        Returns:
+            sqlite3 connection, or None if the database cannot be opened
+        """
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('CREATE TABLE IF NOT EXISTS t(k BLOB PRIMARY KEY, v TEXT, method TEXT)')
+            return db
+        except (OSError, sqlite3.Error) as e:
+            self.logger.warning(f"Persistent translation cache disabled: {e}")
+            return None
+
+    @staticmethod
+    def _db_key(key):
+        """Hash a (source_lang, target_lang, text) cache key for the database"""
+        source_lang, target_lang, text = key
+        return hashlib.sha1(f"{source_lang}|{target_lang}|{text}".encode('utf-8')).digest()
+
+    def _cache_get(self, key):
+        """
+        Return cached (result, method) for key, or None
+
+        Checks the in-memory LRU first, then the persistent cache.
+        """
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            return entry
+
+        if self._db is None:
+            return None
+
+        try:
+            with self._db_lock:
+                row = self._db.execute('SELECT v, method FROM t WHERE k=?',
+                                       (self._db_key(key),)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Translation cache read failed: {e}")
+            return None
+
+        if row is None:
+            return None
+        entry = (row[0], row[1])
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        """Insert into the in-memory LRU, evicting the oldest entry if full"""
+        if key not in self._cache and len(self._cache) >= self._cache_max:
+            self._cache.popitem(last=False)
+        self._cache[key] = entry
+
+    def _store(self, key, result, method):
+        """Cache a translation and record the method used"""
+        self.method_used = method
+        self._remember(key, (result, method))
+
+        if self._db is not None and method in self.PERSISTED_METHODS:
+            try:
+                with self._db_lock:
+                    self._db.execute('INSERT OR REPLACE INTO t(k, v, method) VALUES (?, ?, ?)',
+                                     (self._db_key(key), result, method))
+            except sqlite3.Error as e:
+                self.logger.warning(f"Translation cache write failed: {e}")
+
     def _translate_google(self, text, source_lang, target_lang):
         """Translate using Google Translate API"""
         try:
@@ -188,11 +460,41 @@ class QueryTranslator:
             self.logger.warning(f"Google Translate failed: {e}")
             return None
 
+    def translate_batch_google(self, texts, source_lang, target_lang, max_workers=8):
+        """
+        Translate several texts with Google Translate, overlapping the requests
+
+        Args:
+            texts: List of texts to translate
+            source_lang: 'bangla' or 'english'
+            target_lang: 'bangla' or 'english'
+            max_workers: Maximum concurrent requests
+
+        Returns:
+            List of translations in input order (None where a request failed)
+        """
+        if len(texts) <= 1:
+            return [self._translate_google(text, source_lang, target_lang) for text in texts]
+
+        # Each call builds its own GoogleTranslator: instances keep the query
+        # in their request parameters, so they cannot be shared across threads
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(texts))) as executor:
+            return list(executor.map(
+                lambda text: self._translate_google(text, source_lang, target_lang), texts))
+
     def _translate_marian(self, text, source_lang, target_lang):
         """Translate using MarianMT neural model"""
-        try:
-            import torch
+        results = self._translate_marian_batch([text], source_lang, target_lang)
+        return results[0] if results else None
+
+    def _translate_marian_batch(self, texts, source_lang, target_lang):
+        """
+        Translate several texts using MarianMT, batch_size texts per generate call
 
+        Returns:
+            List of translations in input order, or None on failure
+        """
+        try:
             # Determine direction
             if source_lang == 'bangla' and target_lang == 'english':
                 direction = 'bn_en'
@@ -207,19 +509,49 @@ class QueryTranslator:
 
             # For en->bn, we need to add language tag
             if direction == 'en_bn':
-                text = f">>ben<< {text}"
-
-            # Translate
-            tokens = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-            if self.use_gpu and torch.cuda.is_available():
-                tokens = {k: v.cuda() for k, v in tokens.items()}
-
-            with torch.no_grad():
-                translated = model.generate(**tokens, max_length=512)
-
-            result = tokenizer.decode(translated[0], skip_special_tokens=True)
-            self.logger.debug(f"MarianMT: '{text}' -> '{result}'")
-            return result
+                texts = [f">>ben<< {text}" for text in texts]
+
+            # Sort by length so texts padded together have similar lengths
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            results = [None] * len(texts)
+
+            for start in range(0, len(order), self.batch_size):
+                chunk = order[start:start + self.batch_size]
+
+                if hasattr(model, 'translate_batch'):
+                    # CTranslate2 translator works on subword tokens
+                    source = [
+                        tokenizer.convert_ids_to_tokens(
+                            tokenizer.encode(texts[i], max_length=self.MAX_INPUT_TOKENS, truncation=True))
+                        for i in chunk
+                    ]
+                    output = model.translate_batch(source, beam_size=1,
+                                                   max_decoding_length=self.MAX_OUTPUT_TOKENS)
+                    decoded = [
+                        tokenizer.decode(tokenizer.convert_tokens_to_ids(r.hypotheses[0]),
+                                         skip_special_tokens=True)
+                        for r in output
+                    ]
+                else:
+                    # Translate
+                    tokens = tokenizer([texts[i] for i in chunk], return_tensors="pt", padding=True,
+                                       truncation=True, max_length=self.MAX_INPUT_TOKENS)
+                    if self._device.type == 'cuda':
+                        tokens = {k: v.to(self._device) for k, v in tokens.items()}
+                        autocast = self._torch.autocast('cuda', dtype=self._torch.float16)
+                    else:
+                        autocast = nullcontext()
+
+                    with self._torch.no_grad(), autocast:
+                        translated = model.generate(**tokens, max_length=self.MAX_OUTPUT_TOKENS,
+                                                    num_beams=1, do_sample=False)
+
+                    decoded = tokenizer.batch_decode(translated, skip_special_tokens=True)
+                for i, result in zip(chunk, decoded):
+                    results[i] = result
+                    self.logger.debug(f"MarianMT: '{texts[i]}' -> '{result}'")
+
+            return results
 
         except Exception as e:
             self.logger.warning(f"MarianMT failed: {e}")
@@ -228,24 +560,55 @@ class QueryTranslator:
     def _translate_dictionary(self, text, source_lang, target_lang):
         """Fallback dictionary translation (word by word)"""
         if source_lang == 'english' and target_lang == 'bangla':
-            dictionary = self.FALLBACK_DICT['en_to_bn']
+            dictionary, needs_case = self._fallback_norm['en_to_bn']
         else:
-            dictionary = self.FALLBACK_DICT['bn_to_en']
+            dictionary, needs_case = self._fallback_norm['bn_to_en']
 
-        words = text.split()
-        translated_words = []
+        self.logger.debug(f"Dictionary fallback: '{text}'")
+        if needs_case:
+            return ' '.join([dictionary.get(w.casefold(), w) for w in text.split()])
+        return ' '.join([dictionary.get(w, w) for w in text.split()])
 
-        for word in words:
-            word_lower = word.lower()
-            if word_lower in dictionary:
-                translated_words.append(dictionary[word_lower])
-            elif word in dictionary:
-                translated_words.append(dictionary[word])
-            else:
-                translated_words.append(word)
+    def warmup(self, directions=('bn_en', 'en_bn'), memory_fraction=None):
+        """
+        Load MarianMT models and run a dummy translation ahead of the first query
 
-        self.logger.debug(f"Dictionary fallback: '{text}'")
-        return ' '.join(translated_words)
+        Moves model loading and CUDA initialisation out of the first
+        translate() call. Intended to be called once at startup. If
+        max_resident is smaller than the number of directions, it is raised
+        so that every warmed-up model stays loaded.
+
+        Args:
+            directions: Directions to preload ('bn_en', 'en_bn')
+            memory_fraction: Optional cap on the fraction of GPU memory this
+                process may allocate (CUDA only)
+
+        Returns:
+            List of directions that were loaded
+        """
+        if not self._marian_available:
+            return []
+
+        if memory_fraction is not None and self._device.type == 'cuda':
+            self._torch.cuda.set_per_process_memory_fraction(memory_fraction)
+
+        wanted = len(set(directions))
+        if self._max_resident is not None and wanted > self._max_resident:
+            self.logger.warning(f"Warming up {wanted} MarianMT directions with max_resident="
+                                f"{self._max_resident}; raising max_resident to {wanted}")
+            self._max_resident = wanted
+
+        languages = {'bn_en': ('bangla', 'english'), 'en_bn': ('english', 'bangla')}
+        loaded = []
+        for direction in directions:
+            tokenizer, model = self._load_marian_model(direction)
+            if model is None:
+                continue
+            self._translate_marian_batch(['test'], *languages[direction])
+            loaded.append(direction)
+
+        self.logger.info(f"MarianMT warmed up: {', '.join(loaded) or 'none'}")
+        return loaded
 
     def translate_to_english(self, text):
         """Translate Bangla to English"""
@@ -268,9 +631,17 @@ class QueryTranslator:
         }
 
     def get_cache_size(self):
-        """Get number of cached translations"""
+        """Get number of translations cached in memory"""
         return len(self._cache)
 
-    def clear_cache(self):
-        """Clear translation cache"""
+    def clear_cache(self, persistent=False):
+        """
+        Clear translation cache
+
+        Args:
+            persistent: Also delete translations stored on disk
+        """
         self._cache.clear()
+        if persistent and self._db is not None:
+            with self._db_lock:
+                self._db.execute('DELETE FROM t')
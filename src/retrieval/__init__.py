@@ -7,5 +7,7 @@ from .bm25_model import BM25Retriever
 from .tfidf_model import TFIDFRetriever
 from .fuzzy_model import FuzzyRetriever
 from .semantic_model import SemanticRetriever
+from .hybrid_model import HybridRetriever
+from .utils import run_all
 
-__all__ = ['BM25Retriever', 'TFIDFRetriever', 'FuzzyRetriever', 'SemanticRetriever']
+__all__ = ['BM25Retriever', 'TFIDFRetriever', 'FuzzyRetriever', 'SemanticRetriever', 'HybridRetriever', 'run_all']
@@ -1,27 +1,164 @@
 """
 BM25 Retrieval Model
-Uses rank-bm25 library for lexical retrieval
+Okapi BM25 scored as a sparse matrix product (same formula as rank-bm25's BM25Okapi)
 """
 
-from rank_bm25 import BM25Okapi
+from collections import Counter
+
 import numpy as np
+from scipy.sparse import csr_matrix
+
+from .utils import QueryCache, topk_indices
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _accumulate_scores(indptr, indices, data, term_rows, term_counts, out):
+    """Add term_counts[i] * (row term_rows[i] of a CSR matrix) into out"""
+    for i in range(term_rows.shape[0]):
+        row = term_rows[i]
+        count = term_counts[i]
+        for j in range(indptr[row], indptr[row + 1]):
+            out[indices[j]] += count * data[j]
+
+
+if njit is not None:
+    # Compiled once and cached on disk; releases the GIL so run_all threads overlap
+    _accumulate_scores = njit(nogil=True, fastmath=True, cache=True)(_accumulate_scores)
 
 
 class BM25Retriever:
-    def __init__(self, documents):
+    tokenized_query = True  # search() takes query tokens
+
+    def __init__(self, documents, k1=1.5, b=0.75, epsilon=0.25, cache_size=1024):
         """
         Initialize BM25 retriever
         
         Args:
             documents (list): List of document dictionaries with 'tokens' field
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+            epsilon (float): Floor for negative IDFs, as a fraction of the mean IDF
+            cache_size (int): Number of recent queries whose top-k is cached
         """
         self.documents = documents
         self.tokenized_docs = [doc['tokens'] for doc in documents]
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self._query_cache = QueryCache(cache_size)
         
         print(f"Building BM25 index for {len(documents)} documents...")
-        self.bm25 = BM25Okapi(self.tokenized_docs)
+        self._build_index()
         print("✅ BM25 index built")
     
+    def _build_index(self):
+        """
+        Precompute BM25 term weights as a (vocab_size, n_docs) CSR matrix
+
+        Row t holds IDF(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        for every document containing t, so scoring a query only touches the
+        rows of its terms.
+        """
+        self.vocab = {}
+        rows, cols, tfs = [], [], []
+        doc_lens = np.empty(len(self.tokenized_docs), dtype=np.float32)
+
+        for doc_idx, tokens in enumerate(self.tokenized_docs):
+            doc_lens[doc_idx] = len(tokens)
+            for token, tf in Counter(tokens).items():
+                rows.append(self.vocab.setdefault(token, len(self.vocab)))
+                cols.append(doc_idx)
+                tfs.append(tf)
+
+        n_docs = len(self.tokenized_docs)
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+
+        # IDF with the BM25Okapi epsilon floor for very common terms
+        doc_freq = np.bincount(rows, minlength=len(self.vocab)).astype(np.float64)
+        idf = np.log(n_docs - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        if len(idf):
+            idf[idf < 0] = self.epsilon * idf.mean()
+
+        avgdl = doc_lens.sum() / n_docs if n_docs else 0.0
+        norm = self.k1 * (1 - self.b + self.b * doc_lens / avgdl) if avgdl else np.full(n_docs, self.k1)
+        weights = idf[rows] * (tfs * (self.k1 + 1)) / (tfs + norm[cols])
+
+        self.weights = csr_matrix((weights.astype(np.float32), (rows, cols)),
+                                  shape=(len(self.vocab), n_docs))
+
+        if njit is not None:
+            # Compile the scoring kernel now rather than on the first query
+            self._score_rows(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+
+    def get_scores(self, query_tokens):
+        """
+        BM25 score of every document for the query
+
+        Repeated query tokens count once per occurrence, as in BM25Okapi.
+
+        Returns:
+            np.ndarray of shape (n_docs,)
+        """
+        term_rows, query_vec = self._query_terms(query_tokens)
+        if not term_rows:
+            return np.zeros(len(self.documents), dtype=np.float32)
+        if njit is not None:
+            return self._score_rows(np.asarray(term_rows, dtype=np.int64), query_vec)
+        return self.weights[term_rows].T.dot(query_vec)
+
+    def _score_rows(self, term_rows, query_vec):
+        """Scores from the Numba kernel, walking only the postings of the query terms"""
+        scores = np.zeros(self.weights.shape[1], dtype=np.float32)
+        _accumulate_scores(self.weights.indptr, self.weights.indices, self.weights.data,
+                           term_rows, query_vec, scores)
+        return scores
+
+    def candidate_indices(self, query_tokens, top_k):
+        """
+        Indices of the top_k documents, best first (as ranked by search())
+
+        Args:
+            query_tokens (list): List of query tokens
+            top_k (int): Number of indices to return
+
+        Returns:
+            np.ndarray: Document indices
+        """
+        return self._top_matches(query_tokens, top_k)[0]
+
+    def score_subset(self, query_tokens, doc_indices):
+        """
+        BM25 scores for selected documents only
+
+        Args:
+            query_tokens (list): List of query tokens
+            doc_indices (array-like): Document indices to score
+
+        Returns:
+            np.ndarray: Scores scaled like search()'s 'score' (divided by the
+                best score among doc_indices, or 1.0 if that is smaller)
+        """
+        doc_indices = np.asarray(doc_indices, dtype=np.intp)
+        term_rows, query_vec = self._query_terms(query_tokens)
+        if not term_rows or not len(doc_indices):
+            return np.zeros(len(doc_indices), dtype=np.float32)
+
+        scores = self.weights[term_rows][:, doc_indices].T.dot(query_vec)
+        return scores / max(scores.max(), 1.0)
+
+    def _query_terms(self, query_tokens):
+        """Vocabulary rows of the known query terms and their counts"""
+        counts = Counter(token for token in query_tokens if token in self.vocab)
+        term_rows = [self.vocab[token] for token in counts]
+        query_vec = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return term_rows, query_vec
+
     def search(self, query_tokens, top_k=10):
         """
         Search for documents using BM25
@@ -33,22 +170,27 @@ class BM25Retriever:
         Returns:
             list: List of result dictionaries with doc, score, rank
         """
-        scores = self.bm25.get_scores(query_tokens)
-        top_indices = np.argsort(scores)[-top_k:][::-1]
+        top_indices, top_scores = self._top_matches(query_tokens, top_k)
         
-        results = []
-        max_score = max(scores[top_indices[0]], 1.0) if len(top_indices) > 0 else 1.0
+        max_score = max(top_scores[0], 1.0) if len(top_indices) > 0 else 1.0
+        normalized = (top_scores / max_score).tolist()
         
-        for rank, idx in enumerate(top_indices, 1):
-            results.append({
-                'doc': self.documents[idx],
-                'score': float(scores[idx]) / max_score,
-                'raw_score': float(scores[idx]),
-                'rank': rank,
-                'model': 'BM25'
-            })
-        
-        return results
+        return [
+            {'doc': self.documents[idx], 'score': score, 'raw_score': raw, 'rank': rank, 'model': 'BM25'}
+            for rank, (idx, score, raw) in enumerate(zip(top_indices.tolist(), normalized,
+                                                         top_scores.tolist()), 1)
+        ]
+
+    def _top_matches(self, query_tokens, top_k):
+        """(indices, scores) of the top_k documents, cached per query"""
+        key = QueryCache.key(query_tokens, top_k)
+        matches = self._query_cache.get(key)
+        if matches is None:
+            scores = self.get_scores(query_tokens)
+            top_indices = topk_indices(scores, top_k)
+            matches = (top_indices, scores[top_indices])
+            self._query_cache.put(key, matches)
+        return matches
 
 
 if __name__ == "__main__":
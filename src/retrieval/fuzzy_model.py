@@ -1,27 +1,47 @@
 """
 Fuzzy Matching Retrieval Model
-Uses fuzzywuzzy for fuzzy string matching and transliteration handling
+Uses RapidFuzz for fuzzy string matching and transliteration handling
 """
 
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process
 import numpy as np
 
+from .utils import QueryCache, topk_indices
+
 
 class FuzzyRetriever:
-    def __init__(self, documents):
+    tokenized_query = False  # search() takes the query string
+
+    def __init__(self, documents, cache_size=1024, max_body_chars=2000, prefilter=False):
         """
         Initialize Fuzzy retriever
         
         Args:
             documents (list): List of document dictionaries
+            cache_size (int): Number of recent queries whose top-k is cached
+            max_body_chars (int): Only the first max_body_chars of each body are matched
+            prefilter (bool): Only score documents sharing an exact token with the
+                query (all documents are scored when fewer than top_k share one).
+                Faster, but loses recall: misspelled or transliterated matches
+                are dropped whenever other query tokens hit top_k documents
         """
         self.documents = documents
-        self.doc_texts = []
+        self._query_cache = QueryCache(cache_size)
+        self.prefilter = prefilter
         
         print(f"Building fuzzy search index for {len(documents)} documents...")
-        for doc in documents:
-            text = f"{doc.get('title', '')} {doc.get('body', '')}"
-            self.doc_texts.append(text.lower())
+        self.doc_texts = [f"{doc.get('title', '')} {doc.get('body', '')[:max_body_chars]}".lower()
+                          for doc in documents]
+        
+        # Inverted index token -> doc indices, for the candidate prefilter
+        self._postings = {}
+        if prefilter:
+            postings = {}
+            for idx, (doc, text) in enumerate(zip(documents, self.doc_texts)):
+                tokens = doc.get('tokens') or text.split()
+                for token in set(token.lower() for token in tokens):
+                    postings.setdefault(token, []).append(idx)
+            self._postings = {token: np.array(ids, dtype=np.int32) for token, ids in postings.items()}
         print("✅ Fuzzy index built")
     
     def search(self, query, top_k=10):
@@ -35,22 +55,79 @@ class FuzzyRetriever:
         Returns:
             list: List of result dictionaries with doc, score, rank
         """
-        query_lower = query.lower()
-        scores = [fuzz.partial_ratio(query_lower, text) for text in self.doc_texts]
-        scores = np.array(scores)
-        top_indices = np.argsort(scores)[-top_k:][::-1]
+        top_indices, top_scores = self._top_matches(query.lower(), top_k)
         
         results = []
-        for rank, idx in enumerate(top_indices, 1):
+        for rank, (idx, score) in enumerate(zip(top_indices, top_scores), 1):
             results.append({
                 'doc': self.documents[idx],
-                'score': float(scores[idx]) / 100.0,  # Normalize to [0, 1]
-                'raw_score': int(scores[idx]),
+                'score': float(score) / 100.0,  # Normalize to [0, 1]
+                'raw_score': int(score),
                 'rank': rank,
                 'model': 'Fuzzy'
             })
         
         return results
+    
+    def candidate_indices(self, query, top_k):
+        """
+        Indices of the top_k documents, best first (as ranked by search())
+        
+        Args:
+            query (str): Query string (not tokenized)
+            top_k (int): Number of indices to return
+        
+        Returns:
+            np.ndarray: Document indices
+        """
+        return self._top_matches(query.lower(), top_k)[0]
+        
+    def score_subset(self, query, doc_indices):
+        """
+        Fuzzy scores for selected documents only
+        
+        Args:
+            query (str): Query string (not tokenized)
+            doc_indices (array-like): Document indices to score
+            
+        Returns:
+            np.ndarray: Scores on the same [0, 1] scale as search()'s 'score'
+        """
+        texts = [self.doc_texts[i] for i in doc_indices]
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        scores = process.cdist([query.lower()], texts, scorer=fuzz.partial_ratio,
+                               dtype=np.uint8, workers=-1)[0]
+        return scores / 100.0
+    
+    def _top_matches(self, query_lower, top_k):
+        """(indices, scores) of the top_k documents, cached per query"""
+        key = QueryCache.key(query_lower, top_k)
+        matches = self._query_cache.get(key)
+        if matches is None:
+            candidates = self._candidates(query_lower, top_k)
+            texts = self.doc_texts if candidates is None else [self.doc_texts[i] for i in candidates]
+            # Scores in C++, spread across all cores
+            scores = process.cdist([query_lower], texts, scorer=fuzz.partial_ratio,
+                                   dtype=np.uint8, workers=-1)[0]
+            top = topk_indices(scores, top_k)
+            top_indices = top if candidates is None else candidates[top]
+            matches = (top_indices, scores[top])
+            self._query_cache.put(key, matches)
+        return matches
+    
+    def _candidates(self, query_lower, top_k):
+        """Indices of documents sharing a token with the query, or None for all documents"""
+        if not self.prefilter:
+            return None
+        postings = [self._postings[token] for token in set(query_lower.split())
+                    if token in self._postings]
+        if not postings:
+            return None
+        candidates = np.unique(np.concatenate(postings))
+        if len(candidates) < top_k:
+            return None
+        return candidates
 
 
 if __name__ == "__main__":
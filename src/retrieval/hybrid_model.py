@@ -0,0 +1,110 @@
+"""
+Hybrid Retrieval Model
+Fuses BM25, Semantic and (optionally) TF-IDF/Fuzzy scores over a small
+candidate set instead of the full corpus
+"""
+
+import numpy as np
+
+from .utils import topk_indices
+
+
+# Same weighting as the hybrid in scripts/module_c_complete_analysis.py
+DEFAULT_WEIGHTS = {'BM25': 0.3, 'TF-IDF': 0.0, 'Fuzzy': 0.2, 'Semantic': 0.5}
+
+
+class HybridRetriever:
+    tokenized_query = False  # search() takes the query string
+
+    def __init__(self, bm25, semantic, tfidf=None, fuzzy=None, weights=None,
+                 candidates=100, fusion='weighted', rrf_k=60):
+        """
+        Initialize Hybrid retriever
+
+        Args:
+            bm25 (BM25Retriever): Lexical retriever, also used for candidate generation
+            semantic (SemanticRetriever): Dense retriever, also used for candidate generation
+            tfidf (TFIDFRetriever): Optional, only scores the candidates
+            fuzzy (FuzzyRetriever): Optional, only scores the candidates
+            weights (dict): Per-model weights keyed 'BM25', 'TF-IDF', 'Fuzzy', 'Semantic'
+            candidates (int): Top-M taken from BM25 and from Semantic; their union is scored
+            fusion (str): 'weighted' (weighted score sum) or 'rrf' (reciprocal rank fusion)
+            rrf_k (int): Rank offset for RRF
+        """
+        if fusion not in ('weighted', 'rrf'):
+            raise ValueError(f"Unknown fusion method: {fusion}")
+
+        self.bm25 = bm25
+        self.semantic = semantic
+        self.tfidf = tfidf
+        self.fuzzy = fuzzy
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.candidates = candidates
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.documents = bm25.documents
+
+    def search(self, query, top_k=10, query_tokens=None):
+        """
+        Search for documents by fusing the model scores of the candidate set
+
+        Args:
+            query (str): Query string
+            top_k (int): Number of results to return
+            query_tokens (list): Query tokens for BM25/TF-IDF (default: query.lower().split())
+
+        Returns:
+            list: List of result dictionaries with doc, score, model_scores, rank
+        """
+        if query_tokens is None:
+            query_tokens = query.lower().split()
+
+        candidates = np.union1d(self.bm25.candidate_indices(query_tokens, self.candidates),
+                                self.semantic.candidate_indices(query, self.candidates))
+        if not len(candidates):
+            return []
+
+        model_scores = self._score_candidates(query, query_tokens, candidates)
+        fused = self._fuse(model_scores, len(candidates))
+
+        top = topk_indices(fused, top_k)
+        results = []
+        for rank, i in enumerate(top, 1):
+            results.append({
+                'doc': self.documents[candidates[i]],
+                'score': float(fused[i]),
+                'model_scores': {name: float(scores[i]) for name, scores in model_scores.items()},
+                'rank': rank,
+                'model': 'Hybrid'
+            })
+
+        return results
+
+    def _score_candidates(self, query, query_tokens, candidates):
+        """Scores of every weighted model, restricted to the candidates"""
+        scorers = {
+            'BM25': (self.bm25, query_tokens),
+            'TF-IDF': (self.tfidf, query_tokens),
+            'Fuzzy': (self.fuzzy, query),
+            'Semantic': (self.semantic, query),
+        }
+        model_scores = {}
+        for name, (retriever, model_query) in scorers.items():
+            if retriever is None or not self.weights.get(name):
+                continue
+            model_scores[name] = np.asarray(retriever.score_subset(model_query, candidates),
+                                            dtype=np.float32)
+        return model_scores
+
+    def _fuse(self, model_scores, n):
+        """Combine per-model candidate scores into one score per candidate"""
+        fused = np.zeros(n, dtype=np.float32)
+        for name, scores in model_scores.items():
+            weight = self.weights[name]
+            if self.fusion == 'rrf':
+                ranks = np.empty(n, dtype=np.float32)
+                ranks[np.argsort(-scores, kind='stable')] = np.arange(1, n + 1)
+                fused += weight / (self.rrf_k + ranks)
+            else:
+                fused += weight * scores
+        return fused
@@ -4,59 +4,177 @@ Uses sentence-transformers for multilingual semantic embeddings
 """
 
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import torch
 import pickle
+import mmap
 import os
 
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+from .utils import QueryCache, topk_indices
+
 
 class SemanticRetriever:
-    def __init__(self, documents, model_name='sentence-transformers/LaBSE', cache_file='embeddings_cache.pkl'):
+    tokenized_query = False  # search() takes the query string
+
+    def __init__(self, documents, model_name='sentence-transformers/LaBSE', cache_file='embeddings_cache.npy',
+                 use_hnsw=False, encode_chunk_size=10000, cache_size=1024, mmap_embeddings=False,
+                 score_block_size=65536):
         """
         Initialize Semantic retriever
         
         Args:
             documents (list): List of document dictionaries
             model_name (str): Name of sentence-transformer model
-            cache_file (str): Path to cache embeddings
+            cache_file (str): Path to cache embeddings (a float16 .npy file; a
+                pickle cache of the same name is read once and converted)
+            use_hnsw (bool): Use an approximate FAISS HNSW index instead of
+                exact inner-product search (requires faiss). The index holds
+                its own float32 vectors, so the embeddings are then kept
+                memory-mapped rather than copied into RAM a second time
+            encode_chunk_size (int): Documents encoded and written to the
+                cache per step
+            cache_size (int): Number of recent queries whose embedding and
+                top-k are cached
+            mmap_embeddings (bool): Score straight from the memory-mapped
+                float16 cache instead of a float32 copy in RAM. Pages are
+                shared by every process using the same cache file
+            score_block_size (int): Rows converted to float32 per step when
+                scoring memory-mapped embeddings
         """
         self.documents = documents
         self.model_name = model_name
-        self.cache_file = cache_file
+        self.cache_file = os.path.splitext(cache_file)[0] + '.npy'
+        legacy_cache_file = os.path.splitext(cache_file)[0] + '.pkl'
+        self.encode_chunk_size = encode_chunk_size
+        self.score_block_size = score_block_size
+        self._embedding_cache = QueryCache(cache_size)
+        self._query_cache = QueryCache(cache_size)
+        
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         
         print(f"Loading {model_name} model...")
-        self.model = SentenceTransformer(model_name)
-        print("✅ Model loaded")
+        self.model = SentenceTransformer(model_name, device=self.device)
+        if self.device == 'cuda':
+            # FP16 on GPU only; half precision on CPU is slower than FP32
+            self.model.half()
+        self.model.eval()
+        print(f"✅ Model loaded ({self.device})")
         
         # Load or compute embeddings
-        if os.path.exists(cache_file):
-            print(f"Loading cached embeddings from {cache_file}...")
-            with open(cache_file, 'rb') as f:
-                self.embeddings = pickle.load(f)
-            print(f"✅ Loaded {len(self.embeddings)} cached embeddings")
+        if os.path.exists(self.cache_file):
+            print(f"Loading cached embeddings from {self.cache_file}...")
+            embeddings = np.load(self.cache_file, mmap_mode='r')
+            print(f"✅ Loaded {len(embeddings)} cached embeddings")
+        elif os.path.exists(legacy_cache_file):
+            print(f"Converting cached embeddings from {legacy_cache_file}...")
+            with open(legacy_cache_file, 'rb') as f:
+                embeddings = self._normalize(pickle.load(f)).astype(np.float16)
+            np.save(self.cache_file, embeddings)
+            print(f"✅ Embeddings cached to {self.cache_file}")
         else:
             print(f"Computing embeddings for {len(documents)} documents...")
-            self.embeddings = self._encode_documents()
-            # Save cache
-            with open(cache_file, 'wb') as f:
-                pickle.dump(self.embeddings, f)
-            print(f"✅ Embeddings cached to {cache_file}")
-    
-    def _encode_documents(self):
-        """Encode all documents"""
-        texts = []
-        for doc in self.documents:
-            text = f"{doc.get('title', '')} {doc.get('body', '')[:500]}"
-            texts.append(text)
-        
-        embeddings = self.model.encode(
-            texts,
-            batch_size=64,
-            show_progress_bar=True,
-            convert_to_numpy=True,
-            device='cuda'  # Use GPU
-        )
-        return embeddings
+            embeddings = self._encode_documents(self.cache_file)
+            print(f"✅ Embeddings cached to {self.cache_file}")
+        
+        self.index = None
+        if use_hnsw:
+            if faiss is None:
+                print("⚠️ faiss not installed, using exact search")
+            else:
+                self.index = self._build_index(self._normalize(embeddings))
+                mmap_embeddings = True
+        
+        if mmap_embeddings:
+            # Cached rows are normalized already; keep them on disk, shared
+            # through the page cache
+            self.embeddings = np.load(self.cache_file, mmap_mode='r')
+            self._prefetch()
+        else:
+            # Cached rows are normalized already, up to float16 rounding
+            self.embeddings = self._normalize(embeddings)
+    
+    @staticmethod
+    def _normalize(embeddings):
+        """L2-normalize rows as float32, so dot products are cosine similarities"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        return embeddings / (np.linalg.norm(embeddings, axis=-1, keepdims=True) + 1e-12)
+    
+    def _prefetch(self):
+        """Ask the kernel to start reading the memory-mapped embeddings in ahead of the first query"""
+        mapped = getattr(self.embeddings, '_mmap', None)
+        if mapped is not None and hasattr(mmap, 'MADV_WILLNEED'):
+            mapped.madvise(mmap.MADV_WILLNEED)
+    
+    @staticmethod
+    def _build_index(embeddings):
+        """Build a FAISS HNSW inner-product index over normalized float32 embeddings"""
+        index = faiss.IndexHNSWFlat(embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        index.add(embeddings)
+        return index
+    
+    def _encode_documents(self, path):
+        """
+        Encode all documents into a float16 .npy file at path
+        
+        Documents are encoded encode_chunk_size at a time and written straight
+        to a memory-mapped file, so memory use does not grow with the corpus.
+        The file is moved into place only once it is complete.
+        
+        Returns:
+            np.memmap: Normalized float16 embeddings, one row per document
+        """
+        partial_path = path[:-len('.npy')] + '.partial.npy'
+        embeddings = None
+        
+        for start in range(0, len(self.documents), self.encode_chunk_size):
+            texts = [
+                f"{doc.get('title', '')} {doc.get('body', '')[:500]}"
+                for doc in self.documents[start:start + self.encode_chunk_size]
+            ]
+            with torch.inference_mode():
+                chunk = self.model.encode(
+                    texts,
+                    batch_size=64,
+                    show_progress_bar=True,
+                    convert_to_numpy=True
+                )
+            
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(
+                    partial_path, mode='w+', dtype=np.float16,
+                    shape=(len(self.documents), chunk.shape[1]))
+            embeddings[start:start + len(chunk)] = self._normalize(chunk)
+        
+        if embeddings is None:
+            raise ValueError("SemanticRetriever needs at least one document")
+        
+        embeddings.flush()
+        del embeddings
+        os.replace(partial_path, path)
+        return np.load(path, mmap_mode='r')
+    
+    def _encode_queries(self, queries):
+        """Encode queries in one call and L2-normalize them, reusing cached embeddings"""
+        keys = [QueryCache.key(query) for query in queries]
+        embeddings = [self._embedding_cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        if missing:
+            with torch.inference_mode():
+                encoded = self.model.encode([queries[i] for i in missing], batch_size=64,
+                                            convert_to_numpy=True)
+            for i, embedding in zip(missing, self._normalize(encoded)):
+                embeddings[i] = embedding.copy()
+                self._embedding_cache.put(keys[i], embeddings[i])
+        
+        return np.stack(embeddings)
     
     def search(self, query, top_k=10):
         """
@@ -69,24 +187,112 @@ class SemanticRetriever:
         Returns:
             list: List of result dictionaries with doc, score, rank
         """
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        scores = cosine_similarity(query_embedding, self.embeddings)[0]
-        top_indices = np.argsort(scores)[-top_k:][::-1]
-        
-        results = []
-        for rank, idx in enumerate(top_indices, 1):
-            # Normalize cosine similarity from [-1, 1] to [0, 1]
-            normalized_score = (scores[idx] + 1) / 2
+        return self._pack_results(*self._top_matches(query, top_k))
+    
+    def search_batch(self, queries, top_k=10):
+        """
+        Search for several queries, encoding them together
+        
+        Args:
+            queries (list): Query strings
+            top_k (int): Number of results to return per query
             
-            results.append({
-                'doc': self.documents[idx],
-                'score': float(normalized_score),
-                'cosine_score': float(scores[idx]),
-                'rank': rank,
-                'model': 'Semantic'
-            })
-        
-        return results
+        Returns:
+            list: One result list per query, as returned by search()
+        """
+        if not queries:
+            return []
+        query_embeddings = self._encode_queries(list(queries))
+        return [self._pack_results(top_indices, top_scores)
+                for top_indices, top_scores in self._top_matches_for_embeddings(query_embeddings, top_k)]
+    
+    def _pack_results(self, top_indices, top_scores):
+        """Build result dictionaries from matched indices and cosine scores"""
+        # Normalize cosine similarity from [-1, 1] to [0, 1]
+        normalized = ((top_scores + 1) / 2).tolist()
+        
+        return [
+            {'doc': self.documents[idx], 'score': score, 'cosine_score': cosine, 'rank': rank,
+             'model': 'Semantic'}
+            for rank, (idx, score, cosine) in enumerate(zip(top_indices.tolist(), normalized,
+                                                            top_scores.tolist()), 1)
+        ]
+    
+    def candidate_indices(self, query, top_k):
+        """
+        Indices of the top_k documents, best first (as ranked by search())
+        
+        Args:
+            query (str): Query string
+            top_k (int): Number of indices to return
+        
+        Returns:
+            np.ndarray: Document indices
+        """
+        return self._top_matches(query, top_k)[0]
+        
+    def score_subset(self, query, doc_indices):
+        """
+        Semantic scores for selected documents only
+        
+        Args:
+            query (str): Query string
+            doc_indices (array-like): Document indices to score
+            
+        Returns:
+            np.ndarray: Scores on the same [0, 1] scale as search()'s 'score'
+        """
+        query_embedding = self._encode_queries([query])[0]
+        rows = self.embeddings[np.asarray(doc_indices, dtype=np.intp)]
+        cosine = rows.astype(np.float32, copy=False) @ query_embedding
+        return (cosine + 1) / 2
+    
+    def _top_matches(self, query, top_k):
+        """(indices, cosine scores) of the top_k documents, cached per query"""
+        key = QueryCache.key(query, top_k)
+        matches = self._query_cache.get(key)
+        if matches is None:
+            matches = self._top_matches_for_embeddings(self._encode_queries([query]), top_k)[0]
+            self._query_cache.put(key, matches)
+        return matches
+    
+    def _top_matches_for_embeddings(self, query_embeddings, top_k):
+        """
+        Best documents for each normalized query embedding
+        
+        Returns:
+            list: (indices, cosine scores) per query, best first
+        """
+        k = min(top_k, len(self.documents))
+        if k <= 0:
+            return [(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32))] * len(query_embeddings)
+        
+        if self.index is not None:
+            all_scores, all_indices = self.index.search(query_embeddings, k)
+            # HNSW pads with -1 when it finds fewer than k neighbours
+            return [(indices[indices >= 0], scores[indices >= 0])
+                    for indices, scores in zip(all_indices, all_scores)]
+        
+        all_scores = self._score_all(query_embeddings)
+        matches = []
+        for scores in all_scores:
+            top_indices = topk_indices(scores, k)
+            matches.append((top_indices, scores[top_indices]))
+        return matches
+    
+    def _score_all(self, query_embeddings):
+        """Cosine scores of every document for each query, shape (queries, documents)"""
+        if self.embeddings.dtype == np.float32:
+            # One matrix product for all queries
+            return query_embeddings @ self.embeddings.T
+        
+        # Memory-mapped float16: convert a block of rows at a time, so only
+        # one block is ever held as float32
+        all_scores = np.empty((len(query_embeddings), len(self.embeddings)), dtype=np.float32)
+        for start in range(0, len(self.embeddings), self.score_block_size):
+            block = self.embeddings[start:start + self.score_block_size].astype(np.float32)
+            all_scores[:, start:start + len(block)] = query_embeddings @ block.T
+        return all_scores
 
 
 if __name__ == "__main__":
@@ -99,7 +305,7 @@ if __name__ == "__main__":
         {'id': 3, 'title': 'Sports Update', 'body': 'Cricket match scheduled for today'}
     ]
     
-    retriever = SemanticRetriever(test_docs, cache_file='test_embeddings.pkl')
+    retriever = SemanticRetriever(test_docs, cache_file='test_embeddings.npy')
     results = retriever.search('cricket bangladesh', top_k=2)
     
     print("\nTest Results:")
@@ -109,5 +315,5 @@ if __name__ == "__main__":
     print("\n✅ Semantic test passed!")
     
     # Cleanup test cache
-    if os.path.exists('test_embeddings.pkl'):
-        os.remove('test_embeddings.pkl')
+    if os.path.exists('test_embeddings.npy'):
+        os.remove('test_embeddings.npy')
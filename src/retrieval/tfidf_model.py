@@ -3,25 +3,44 @@ TF-IDF Retrieval Model
 Uses scikit-learn for TF-IDF vectorization and cosine similarity
 """
 
+import re
+
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
+from .utils import QueryCache, topk_indices
+
+
+# scikit-learn's default token pattern (runs of 2+ word characters), widened
+# to the Bengali block and zero-width (non-)joiners: \w alone excludes Bangla
+# vowel signs and viramas, which splits words into single letters
+_TOKEN_RE = re.compile(r'[\w\u0980-\u09FF\u200C\u200D]{2,}')
+
+
+def _analyze(tokens):
+    """Analyzer for already tokenized text: lowercase and strip punctuation per token"""
+    return [term for token in tokens for term in _TOKEN_RE.findall(token.lower())]
+
 
 class TFIDFRetriever:
-    def __init__(self, documents):
+    tokenized_query = True  # search() takes query tokens
+
+    def __init__(self, documents, cache_size=1024):
         """
         Initialize TF-IDF retriever
         
         Args:
             documents (list): List of document dictionaries with 'tokens' field
+            cache_size (int): Number of recent queries whose top-k is cached
         """
         self.documents = documents
-        self.doc_texts = [' '.join(doc['tokens']) for doc in documents]
+        self._query_cache = QueryCache(cache_size)
         
         print(f"Building TF-IDF matrix for {len(documents)} documents...")
-        self.vectorizer = TfidfVectorizer()
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.doc_texts)
+        # Same terms as the default analyzer, without joining and re-splitting
+        # the tokens, and with Bangla words kept whole
+        self.vectorizer = TfidfVectorizer(analyzer=_analyze, dtype=np.float32)
+        self.tfidf_matrix = self.vectorizer.fit_transform([doc['tokens'] for doc in documents])
         print("✅ TF-IDF matrix built")
     
     def search(self, query_tokens, top_k=10):
@@ -35,21 +54,53 @@ class TFIDFRetriever:
         Returns:
             list: List of result dictionaries with doc, score, rank
         """
-        query_text = ' '.join(query_tokens)
-        query_vec = self.vectorizer.transform([query_text])
-        scores = cosine_similarity(query_vec, self.tfidf_matrix)[0]
-        top_indices = np.argsort(scores)[-top_k:][::-1]
+        top_indices, top_scores = self._top_matches(query_tokens, top_k)
+        
+        return [
+            {'doc': self.documents[idx], 'score': score, 'rank': rank, 'model': 'TF-IDF'}
+            for rank, (idx, score) in enumerate(zip(top_indices.tolist(), top_scores.tolist()), 1)
+        ]
+    
+    def candidate_indices(self, query_tokens, top_k):
+        """
+        Indices of the top_k documents, best first (as ranked by search())
         
-        results = []
-        for rank, idx in enumerate(top_indices, 1):
-            results.append({
-                'doc': self.documents[idx],
-                'score': float(scores[idx]),
-                'rank': rank,
-                'model': 'TF-IDF'
-            })
+        Args:
+            query_tokens (list): List of query tokens
+            top_k (int): Number of indices to return
         
-        return results
+        Returns:
+            np.ndarray: Document indices
+        """
+        return self._top_matches(query_tokens, top_k)[0]
+        
+    def score_subset(self, query_tokens, doc_indices):
+        """
+        TF-IDF cosine scores for selected documents only
+        
+        Args:
+            query_tokens (list): List of query tokens
+            doc_indices (array-like): Document indices to score
+            
+        Returns:
+            np.ndarray: Scores on the same scale as search()'s 'score'
+        """
+        doc_indices = np.asarray(doc_indices, dtype=np.intp)
+        query_vec = self.vectorizer.transform([list(query_tokens)])
+        return (self.tfidf_matrix[doc_indices] @ query_vec.T).toarray().ravel()
+    
+    def _top_matches(self, query_tokens, top_k):
+        """(indices, scores) of the top_k documents, cached per query"""
+        key = QueryCache.key(query_tokens, top_k)
+        matches = self._query_cache.get(key)
+        if matches is None:
+            query_vec = self.vectorizer.transform([list(query_tokens)])
+            # Rows and query are L2-normalized, so the dot product is the cosine
+            scores = (self.tfidf_matrix @ query_vec.T).toarray().ravel()
+            top_indices = topk_indices(scores, top_k)
+            matches = (top_indices, scores[top_indices])
+            self._query_cache.put(key, matches)
+        return matches
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+"""
+Shared helpers for the retrieval models
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def topk_indices(scores, k):
+    """
+    Indices of the k highest scores, best first
+
+    Partitions in O(N) and only sorts the k selected entries, instead of
+    sorting every score. Scores are never negated, so unsigned dtypes work.
+
+    Args:
+        scores (np.ndarray): 1-D array of document scores
+        k (int): Number of indices to return
+
+    Returns:
+        np.ndarray: Indices into scores, ordered by descending score
+    """
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    return top[np.argsort(scores[top])[::-1]]
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of per-query values
+
+    Keys are 16-byte blake2b digests of the query, so long queries are not
+    kept in memory. Safe to share between threads.
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        Args:
+            max_size (int): Maximum number of cached queries (0 disables caching)
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query, *params):
+        """
+        Cache key for a query string or token list plus extra parameters
+
+        Returns:
+            bytes: 16-byte digest
+        """
+        if not isinstance(query, str):
+            query = '\x1f'.join(query)
+        text = '\x1e'.join([query, *map(str, params)])
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Cache value for key, evicting the least recently used entry if full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def run_all(retrievers, query, query_tokens=None, top_k=10, max_workers=None):
+    """
+    Search with several retrievers concurrently
+
+    The retrievers spend most of their time in NumPy/SciPy/RapidFuzz/torch
+    code that releases the GIL, so threads bring the latency of a
+    multi-model query close to that of the slowest model.
+
+    Args:
+        retrievers (dict): {model_name: retriever}
+        query (str): Query string
+        query_tokens (list): Tokens for retrievers that take them (default: query.lower().split())
+        top_k (int): Number of results per model
+        max_workers (int): Thread count (default: one per retriever)
+
+    Returns:
+        dict: {model_name: results}, in the order of retrievers
+    """
+    if query_tokens is None:
+        query_tokens = query.lower().split()
+    if not retrievers:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(retrievers)) as executor:
+        futures = {
+            name: executor.submit(retriever.search,
+                                  query_tokens if retriever.tokenized_query else query,
+                                  top_k=top_k)
+            for name, retriever in retrievers.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
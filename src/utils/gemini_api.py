@@ -1,17 +1,46 @@
 """Gemini API utilities for NER and query expansion fallback"""
 
 import os
+import re
 import json
+import time
+import hashlib
+import sqlite3
+import threading
+from functools import lru_cache
 from .logger import setup_logger
+from .helpers import CACHE_DIR
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = setup_logger('GeminiAPI')
 
+MODEL = "gemini-2.0-flash"
+
+# Successful responses are kept on disk for a week
+CACHE_PATH = os.path.join(CACHE_DIR, 'gemini.sqlite')
+CACHE_TTL = 7 * 24 * 3600
+
+_cache_db = None  # sqlite3 connection, False if the cache could not be opened
+_cache_lock = threading.Lock()
+
+# Markdown code block around a JSON response (closing fence optional)
+_CODE_FENCE = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|\Z)', re.DOTALL)
+
 
 def _get_client():
-    """Get Gemini API client"""
+    """Get Gemini API client (one shared client per API key)"""
+    return _create_client(os.environ.get("GEMINI_API_KEY"))
+
+
+@lru_cache(maxsize=1)
+def _create_client(api_key):
+    """Create the Gemini API client, reused so its HTTP connections are kept alive"""
     try:
         from google import genai
-        api_key = os.environ.get("GEMINI_API_KEY")
         if not api_key:
             logger.warning("GEMINI_API_KEY not set in environment")
             return None
@@ -21,6 +50,74 @@ def _get_client():
         return None
 
 
+def _get_cache():
+    """Open the on-disk response cache on first use (None if unavailable)"""
+    global _cache_db
+    with _cache_lock:
+        if _cache_db is None:
+            try:
+                os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+                db = sqlite3.connect(CACHE_PATH, isolation_level=None, check_same_thread=False)
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('PRAGMA synchronous=NORMAL')
+                db.execute('CREATE TABLE IF NOT EXISTS responses(k BLOB PRIMARY KEY, v TEXT, created REAL)')
+                _cache_db = db
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Gemini response cache disabled: {e}")
+                _cache_db = False
+    return _cache_db or None
+
+
+def _cache_key(fn, prompt):
+    """Cache key for a prompt sent on behalf of fn"""
+    return hashlib.blake2b(f"{fn}|{MODEL}|{prompt}".encode('utf-8'), digest_size=16).digest()
+
+
+def _cache_get(fn, prompt):
+    """Return the cached result for a prompt, or None if missing or expired"""
+    db = _get_cache()
+    if db is None:
+        return None
+    try:
+        with _cache_lock:
+            row = db.execute('SELECT v FROM responses WHERE k=? AND created>?',
+                             (_cache_key(fn, prompt), time.time() - CACHE_TTL)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Gemini cache read failed: {e}")
+        return None
+    return _json_loads(row[0]) if row else None
+
+
+def _cache_put(fn, prompt, result):
+    """Store a successful result for a prompt"""
+    db = _get_cache()
+    if db is None:
+        return
+    try:
+        with _cache_lock:
+            db.execute('INSERT OR REPLACE INTO responses(k, v, created) VALUES (?, ?, ?)',
+                       (_cache_key(fn, prompt), json.dumps(result, ensure_ascii=False), time.time()))
+    except sqlite3.Error as e:
+        logger.warning(f"Gemini cache write failed: {e}")
+
+
+def _parse_json(text):
+    """Parse a JSON response, removing a surrounding markdown code block"""
+    text = text.strip()
+    match = _CODE_FENCE.match(text)
+    if match:
+        text = match.group(1)
+    return _json_loads(text)
+
+
+def _synonyms_prompt(word, language, max_synonyms):
+    """Prompt asking for synonyms of a single word"""
+    lang_name = "Bengali/Bangla" if language == "bangla" else "English"
+    return f"""Give me {max_synonyms} synonyms for the word "{word}" in {lang_name}.
+Return ONLY a JSON array of synonyms, nothing else. Example: ["synonym1", "synonym2"]
+If the word has no synonyms or you don't know, return an empty array: []"""
+
+
 def get_synonyms(word: str, language: str = "english", max_synonyms: int = 5) -> list:
     """
     Get synonyms for a word using Gemini API
@@ -33,6 +130,11 @@ def get_synonyms(word: str, language: str = "english", max_synonyms: int = 5) ->
     Returns:
         List of synonyms (empty list if API fails)
     """
+    prompt = _synonyms_prompt(word, language, max_synonyms)
+    cached = _cache_get('get_synonyms', prompt)
+    if cached is not None:
+        return cached[:max_synonyms]
+
     client = _get_client()
     if not client:
         return []
@@ -40,14 +142,8 @@ def get_synonyms(word: str, language: str = "english", max_synonyms: int = 5) ->
     try:
         from google.genai import types
 
-        lang_name = "Bengali/Bangla" if language == "bangla" else "English"
-
-        prompt = f"""Give me {max_synonyms} synonyms for the word "{word}" in {lang_name}.
-Return ONLY a JSON array of synonyms, nothing else. Example: ["synonym1", "synonym2"]
-If the word has no synonyms or you don't know, return an empty array: []"""
-
         response = client.models.generate_content(
-            model="gemini-2.0-flash",
+            model=MODEL,
             contents=[types.Content(
                 role="user",
                 parts=[types.Part.from_text(text=prompt)]
@@ -58,18 +154,10 @@ If the word has no synonyms or you don't know, return an empty array: []"""
             )
         )
 
-        # Parse JSON response
-        text = response.text.strip()
-        # Handle markdown code blocks
-        if text.startswith("```"):
-            text = text.split("```")[1]
-            if text.startswith("json"):
-                text = text[4:]
-            text = text.strip()
-
-        synonyms = json.loads(text)
+        synonyms = _parse_json(response.text)
         if isinstance(synonyms, list):
             logger.debug(f"Gemini synonyms for '{word}': {synonyms}")
+            _cache_put('get_synonyms', prompt, synonyms)
             return synonyms[:max_synonyms]
         return []
 
@@ -78,6 +166,76 @@ If the word has no synonyms or you don't know, return an empty array: []"""
         return []
 
 
+def get_synonyms_batch(words: list, language: str = "english", max_synonyms: int = 5) -> dict:
+    """
+    Get synonyms for several words with a single Gemini request
+
+    Results share the get_synonyms() cache, so only uncached words are sent.
+
+    Args:
+        words: Words to find synonyms for
+        language: 'english' or 'bangla'
+        max_synonyms: Maximum number of synonyms per word
+
+    Returns:
+        Dict {word: list of synonyms} (empty lists for words the API fails on)
+    """
+    results = {}
+    missing = []
+    for word in dict.fromkeys(words):
+        cached = _cache_get('get_synonyms', _synonyms_prompt(word, language, max_synonyms))
+        if cached is None:
+            missing.append(word)
+        else:
+            results[word] = cached[:max_synonyms]
+
+    if not missing:
+        return results
+
+    results.update((word, []) for word in missing)
+    client = _get_client()
+    if not client:
+        return results
+
+    try:
+        from google.genai import types
+
+        lang_name = "Bengali/Bangla" if language == "bangla" else "English"
+
+        prompt = f"""Give me up to {max_synonyms} synonyms in {lang_name} for each of these words: {json.dumps(missing, ensure_ascii=False)}
+Return ONLY a JSON object mapping each word to an array of its synonyms, nothing else. Example: {{"word1": ["synonym1", "synonym2"], "word2": []}}
+If a word has no synonyms or you don't know, map it to an empty array."""
+
+        response = client.models.generate_content(
+            model=MODEL,
+            contents=[types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=prompt)]
+            )],
+            config=types.GenerateContentConfig(
+                temperature=0.1,
+                max_output_tokens=min(100 + 100 * len(missing), 8192),
+            )
+        )
+
+        mapping = _parse_json(response.text)
+        if not isinstance(mapping, dict):
+            return results
+
+        for word in missing:
+            synonyms = mapping.get(word)
+            if isinstance(synonyms, list):
+                results[word] = synonyms[:max_synonyms]
+                _cache_put('get_synonyms', _synonyms_prompt(word, language, max_synonyms), synonyms)
+
+        logger.debug(f"Gemini batch synonyms for {len(missing)} words")
+        return results
+
+    except Exception as e:
+        logger.warning(f"Gemini API batch synonym lookup failed: {e}")
+        return results
+
+
 def map_entity(entity: str, source_lang: str, target_lang: str) -> str:
     """
     Map a named entity from source language to target language using Gemini
@@ -93,6 +251,18 @@ def map_entity(entity: str, source_lang: str, target_lang: str) -> str:
     if source_lang == target_lang:
         return entity
 
+    src_name = "Bengali/Bangla" if source_lang == "bangla" else "English"
+    tgt_name = "Bengali/Bangla" if target_lang == "bangla" else "English"
+
+    prompt = f"""Translate this named entity from {src_name} to {tgt_name}: "{entity}"
+
+This is a proper noun (person name, place, organization, etc). Provide the standard translation/transliteration used in {tgt_name}.
+Return ONLY the translated entity, nothing else. If you cannot translate it, return the original text."""
+
+    cached = _cache_get('map_entity', prompt)
+    if cached is not None:
+        return cached
+
     client = _get_client()
     if not client:
         return entity
@@ -100,16 +270,8 @@ def map_entity(entity: str, source_lang: str, target_lang: str) -> str:
     try:
         from google.genai import types
 
-        src_name = "Bengali/Bangla" if source_lang == "bangla" else "English"
-        tgt_name = "Bengali/Bangla" if target_lang == "bangla" else "English"
-
-        prompt = f"""Translate this named entity from {src_name} to {tgt_name}: "{entity}"
-
-This is a proper noun (person name, place, organization, etc). Provide the standard translation/transliteration used in {tgt_name}.
-Return ONLY the translated entity, nothing else. If you cannot translate it, return the original text."""
-
         response = client.models.generate_content(
-            model="gemini-2.0-flash",
+            model=MODEL,
             contents=[types.Content(
                 role="user",
                 parts=[types.Part.from_text(text=prompt)]
@@ -123,6 +285,7 @@ Return ONLY the translated entity, nothing else. If you cannot translate it, ret
         result = response.text.strip().strip('"\'')
         if result:
             logger.debug(f"Gemini mapped entity '{entity}' -> '{result}'")
+            _cache_put('map_entity', prompt, result)
             return result
         return entity
 
@@ -142,21 +305,47 @@ def extract_entities(text: str, language: str = "english") -> list:
     Returns:
         List of dicts with entity info: [{'text': str, 'label': str, 'method': 'gemini_ner'}]
     """
+    prompt = f"""Extract all named entities from this text: "{text}"
+
+Return a JSON array of objects with 'text' (the entity) and 'label' (entity type like PERSON, ORG, GPE, LOC, DATE, etc).
+Example: [{{"text": "Bangladesh", "label": "GPE"}}, {{"text": "Sheikh Hasina", "label": "PERSON"}}]
+If no entities found, return: []"""
+
+    entities = _cache_get('extract_entities', prompt)
+    if entities is None:
+        entities = _request_entities(prompt)
+        if entities is None:
+            return []
+        _cache_put('extract_entities', prompt, entities)
+
+    # Add method marker and find positions
+    for ent in entities:
+        ent['method'] = 'gemini_ner'
+        # Find position in original text
+        start = text.lower().find(ent['text'].lower())
+        ent['start'] = start if start >= 0 else 0
+        ent['end'] = (start + len(ent['text'])) if start >= 0 else len(ent['text'])
+
+    logger.debug(f"Gemini extracted {len(entities)} entities from text")
+    return entities
+
+
+def _request_entities(prompt):
+    """
+    Send an entity extraction prompt to Gemini
+
+    Returns:
+        List of {'text', 'label'} dicts, or None if the request fails
+    """
     client = _get_client()
     if not client:
-        return []
+        return None
 
     try:
         from google.genai import types
 
-        prompt = f"""Extract all named entities from this text: "{text}"
-
-Return a JSON array of objects with 'text' (the entity) and 'label' (entity type like PERSON, ORG, GPE, LOC, DATE, etc).
-Example: [{{"text": "Bangladesh", "label": "GPE"}}, {{"text": "Sheikh Hasina", "label": "PERSON"}}]
-If no entities found, return: []"""
-
         response = client.models.generate_content(
-            model="gemini-2.0-flash",
+            model=MODEL,
             contents=[types.Content(
                 role="user",
                 parts=[types.Part.from_text(text=prompt)]
@@ -167,32 +356,14 @@ If no entities found, return: []"""
             )
         )
 
-        # Parse JSON response
-        result_text = response.text.strip()
-        # Handle markdown code blocks
-        if result_text.startswith("```"):
-            result_text = result_text.split("```")[1]
-            if result_text.startswith("json"):
-                result_text = result_text[4:]
-            result_text = result_text.strip()
-
-        entities = json.loads(result_text)
+        entities = _parse_json(response.text)
         if isinstance(entities, list):
-            # Add method marker and find positions
-            for ent in entities:
-                ent['method'] = 'gemini_ner'
-                # Find position in original text
-                start = text.lower().find(ent['text'].lower())
-                ent['start'] = start if start >= 0 else 0
-                ent['end'] = (start + len(ent['text'])) if start >= 0 else len(ent['text'])
-
-            logger.debug(f"Gemini extracted {len(entities)} entities from text")
-            return entities
-        return []
+            return [{'text': str(ent['text']), 'label': ent.get('label')} for ent in entities]
+        return None
 
     except Exception as e:
         logger.warning(f"Gemini API entity extraction failed: {e}")
-        return []
+        return None
 
 
 def is_available() -> bool:
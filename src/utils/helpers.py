@@ -1,10 +1,35 @@
 """Helper utilities for CLIR project"""
 
+import os
 import re
 import hashlib
 from datetime import datetime
 from urllib.parse import urlparse
 
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    _parse_iso = datetime.fromisoformat
+
+
+# Per-user directory for converted models and other derived caches
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'dm-clir')
+
+# Date formats tried by parse_date() when ISO parsing fails, in order
+# ('%Y-%m-%d' still catches dates without zero padding, e.g. 2024-1-5)
+_DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%d-%m-%Y',
+    '%Y/%m/%d',
+    '%d/%m/%Y',
+    '%B %d, %Y',
+    '%d %B %Y',
+)
+
+# http(s) URL split into (scheme, netloc, path). URLs it does not match
+# (other schemes, ;params, IPv6 hosts, whitespace) go through urlparse.
+_URL_RE = re.compile(r'(https?)://([^/?#\[\]\s]+)(/[^?#;\s]*)?(?:[?#]|$)', re.IGNORECASE)
+
 
 def generate_doc_id(url, title=""):
     """
@@ -22,6 +47,22 @@ def generate_doc_id(url, title=""):
     return hash_obj.hexdigest()[:12]
 
 
+def generate_doc_ids(pairs):
+    """
+    Generate document IDs for many documents at once
+
+    Same IDs as generate_doc_id(), without the per-call overhead.
+
+    Args:
+        pairs: Iterable of (url, title) tuples
+
+    Returns:
+        List of document IDs
+    """
+    md5 = hashlib.md5
+    return [md5(f"{url}{title}".encode('utf-8')).hexdigest()[:12] for url, title in pairs]
+
+
 def clean_url(url):
     """
     Clean and normalize URL
@@ -34,6 +75,10 @@ def clean_url(url):
     """
     url = url.strip()
     # Remove query parameters and fragments for deduplication
+    match = _URL_RE.match(url)
+    if match:
+        scheme, netloc, path = match.groups()
+        return f"{scheme.lower()}://{netloc}{path or ''}"
     parsed = urlparse(url)
     return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
 
@@ -48,11 +93,13 @@ def is_valid_url(url):
     Returns:
         Boolean
     """
+    if isinstance(url, str) and _URL_RE.match(url):
+        return True
     try:
         result = urlparse(url)
-        return all([result.scheme, result.netloc])
-    except:
+    except (TypeError, ValueError, AttributeError):
         return False
+    return bool(result.scheme and result.netloc)
 
 
 def parse_date(date_string):
@@ -68,21 +115,20 @@ def parse_date(date_string):
     if not date_string:
         return datetime.now().strftime('%Y-%m-%d')
 
+    date_string = date_string.strip()
+
+    # ISO 8601 (dates and full timestamps) parsed in C
+    try:
+        return _parse_iso(date_string).strftime('%Y-%m-%d')
+    except ValueError:
+        pass
+
     # Try common formats
-    formats = [
-        '%Y-%m-%d',
-        '%d-%m-%Y',
-        '%Y/%m/%d',
-        '%d/%m/%Y',
-        '%B %d, %Y',
-        '%d %B %Y',
-    ]
-
-    for fmt in formats:
+    for fmt in _DATE_FORMATS:
         try:
-            dt = datetime.strptime(date_string.strip(), fmt)
+            dt = datetime.strptime(date_string, fmt)
             return dt.strftime('%Y-%m-%d')
-        except:
+        except ValueError:
             continue
 
     # If all fail, return current date
@@ -99,5 +145,4 @@ def count_words(text):
     Returns:
         Word count
     """
-    words = re.findall(r'\S+', text)
-    return len(words)
+    return len(text.split())